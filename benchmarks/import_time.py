@@ -0,0 +1,97 @@
+"""
+Import-time budget for the app's startup path.
+
+    python -m benchmarks.import_time                 # check against the budget
+    python -m benchmarks.import_time --budget 900    # tighter budget for this machine
+
+Imports the modules app.py needs to serve its first page (the Home tab) in
+a fresh interpreter, the way a cold container does, and reports the best
+of a few runs with the slowest modules from `python -X importtime`. The
+exit code is 1 when the import time exceeds the budget or when a module
+that must stay lazy (charts, the Google client) got imported at startup.
+tests/test_startup.py checks the lazy modules on every run, and the time
+budget only when BLSH_IMPORT_BUDGET_MS is set: wall-clock timings vary too
+much between runs for a default.
+
+The default budget is the measured startup after charts and the Google
+client were made lazy (~1,100 ms best of 7 on the reference machine, vs
+~1,100-1,270 ms before) plus a little headroom; set BLSH_IMPORT_BUDGET_MS
+to this machine's number elsewhere.
+"""
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+# Only imported by the tabs / fetches that need them
+LAZY_MODULES = ["plots", "plotly.express", "utils.figure_cache", "utils.sheets_connector",
+                "gspread", "google.oauth2.service_account"]
+
+BUDGET_MS = float(os.environ.get("BLSH_IMPORT_BUDGET_MS", "1150"))
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def startup_imports() -> str:
+    """app.py's module-level import statements, plus the refresh worker its first snapshot starts."""
+    with open(os.path.join(ROOT, "app.py"), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    statements = [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return "\n".join(statements + ["from utils import refresh_worker"])
+
+
+def measure() -> tuple:
+    """(milliseconds, eagerly imported lazy modules, {module: self ms}) for one cold import."""
+    probe = "\n".join([
+        "import time",
+        "start = time.perf_counter()",
+        startup_imports(),
+        "elapsed = time.perf_counter() - start",
+        "import sys",
+        "print(elapsed * 1000)",
+        f"print(','.join(name for name in {LAZY_MODULES!r} if name in sys.modules))",
+    ])
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    ms, eager = result.stdout.splitlines()[-2:]
+
+    self_ms = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, _, name = line[len("import time:"):].split("|")
+        self_ms[name.strip()] = int(own) / 1000
+    return float(ms), [name for name in eager.split(",") if name], self_ms
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--budget", type=float, default=BUDGET_MS, help="allowed startup import time (ms)")
+    parser.add_argument("--repeat", type=int, default=3, help="cold imports; the fastest one counts")
+    parser.add_argument("--top", type=int, default=10, help="slowest modules to list")
+    args = parser.parse_args(argv)
+
+    runs = [measure() for _ in range(max(args.repeat, 1))]
+    ms, eager, self_ms = min(runs, key=lambda run: run[0])
+
+    print(f"Startup imports: {ms:,.0f} ms (budget {args.budget:,.0f} ms, best of {len(runs)})")
+    for name, own in sorted(self_ms.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {name:<48} {own:>8.1f} ms")
+
+    failed = False
+    if eager:
+        print(f"\n❌ Imported at startup but should be lazy: {', '.join(eager)}")
+        failed = True
+    if ms > args.budget:
+        print(f"\n❌ Startup imports take {ms:,.0f} ms, over the {args.budget:,.0f} ms budget")
+        failed = True
+    if not failed:
+        print("\n✅ Startup imports within budget")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
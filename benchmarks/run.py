@@ -0,0 +1,201 @@
+"""
+Scaling benchmark for preprocessing, snapshot building and every query.
+
+Runs entirely offline on synthetic sheets (benchmarks/synthetic.py), so it
+needs neither Google credentials nor Streamlit:
+
+    python -m benchmarks.run                      # 10k and 100k rows
+    python -m benchmarks.run --sizes 10k,1M,10M   # size hardware for growth
+    python -m benchmarks.run --save-baseline      # record this machine's numbers
+
+For each size it times preprocess_data and build_snapshot --repeat times,
+and the first (cold) call of each query function on --repeat snapshots
+built for that query alone, so no cold call reuses what another query
+left in the snapshot; "seconds" is the median of those cold runs.
+"warm_seconds" is the median of --repeat more calls on the last snapshot,
+which includes per-snapshot caches. Peak Python-side memory is measured
+with tracemalloc on another fresh snapshot per step. Results are compared with the stored baselines; a
+step is a regression when it is both TOLERANCE slower (or larger) and more
+than the absolute slack below, and the exit code is 1. Steps that have no
+baseline yet are listed, so they are not skipped silently.
+
+Startup import time has its own check: python -m benchmarks.import_time.
+
+tracemalloc sees NumPy/pandas buffers but not DuckDB's or Arrow's own
+allocators, so peak memory of the SQL-heavy queries is a lower bound.
+"""
+import argparse
+import inspect
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import query
+from benchmarks import synthetic
+from utils.snapshot import build_snapshot
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+
+TOLERANCE = 0.25
+SLACK_SECONDS = 0.005
+SLACK_MB = 1.0
+
+# Arguments for query functions beyond `snap`
+QUERY_ARGS = {
+    "performance_table": ("All months",),
+    "service_count": ("All months",),
+    "unique_service_counts": ("All months",),
+    "table_columns": (query.DAYS_SINCE_LAST_VISIT,),
+    "table_count": (query.DAYS_SINCE_LAST_VISIT, "98"),
+    "table_page": (query.DAYS_SINCE_LAST_VISIT, "98", "Customer_Name", True, 50, 100),
+    "table_rows": (query.DAYS_SINCE_LAST_VISIT,),
+}
+
+# Functions that take a snapshot but are not queries
+NOT_QUERIES = {"seed_table"}
+
+
+def parse_size(text: str) -> int:
+    """"10k" -> 10_000, "1M" -> 1_000_000, "2500" -> 2500."""
+    text = text.strip().lower()
+    factor = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * factor)
+
+
+def query_functions():
+    """Every public query.py function that takes a snapshot as first argument."""
+    functions = {}
+    for name, func in inspect.getmembers(query, inspect.isfunction):
+        if func.__module__ != query.__name__ or name.startswith("_") or name in NOT_QUERIES:
+            continue
+        if list(inspect.signature(func).parameters)[:1] == ["snap"]:
+            functions[name] = func
+    return functions
+
+
+def _seconds(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def _peak_mb(func, *args):
+    tracemalloc.start()
+    try:
+        result = func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 2**20, result
+
+
+def bench_size(rows: int, repeat: int) -> dict:
+    """Timings (medians of `repeat` runs) and peak memory for one history size."""
+    clients = synthetic.client_data(rows)
+    products = synthetic.product_sale(max(rows // 5, 1))
+    results = {}
+
+    def record(name, cold, warm, peak):
+        results[name] = {"seconds": round(cold, 6), "warm_seconds": round(warm, 6), "peak_mb": round(peak, 3)}
+        print(f"  {name:<32} {cold * 1000:>10.1f} ms {warm * 1000:>10.1f} ms {peak:>10.1f} MB", flush=True)
+
+    print(f"\n{rows:,} client rows / {len(products):,} product rows")
+    print(f"  {'step':<32} {'cold':>13} {'warm':>13} {'peak':>13}")
+
+    # preprocess_data keeps no state between calls, so every run is cold
+    runs = [_seconds(query.preprocess_data, clients.copy())[0] for _ in range(repeat)]
+    peak, _ = _peak_mb(query.preprocess_data, clients.copy())
+    record("preprocess_data", statistics.median(runs), statistics.median(runs), peak)
+
+    runs = [_seconds(query.preprocess_data, clients.copy(), True)[0] for _ in range(repeat)]
+    peak, _ = _peak_mb(query.preprocess_data, clients.copy(), True)
+    record("preprocess_data(compact)", statistics.median(runs), statistics.median(runs), peak)
+
+    def fresh():
+        return build_snapshot(clients.copy(), products.copy())
+
+    runs = [_seconds(fresh)[0] for _ in range(repeat)]
+    peak, _ = _peak_mb(fresh)
+    record("build_snapshot", statistics.median(runs), statistics.median(runs), peak)
+
+    # Queries reuse each other's per-snapshot results (memo and materialized
+    # tables), so every cold call and every peak gets a snapshot of its own
+    for name, func in query_functions().items():
+        args = QUERY_ARGS.get(name, ())
+        cold = []
+        for _ in range(repeat):
+            snap = fresh()
+            cold.append(_seconds(func, snap, *args)[0])
+        warm = [_seconds(func, snap, *args)[0] for _ in range(repeat)]
+        peak, _ = _peak_mb(func, fresh(), *args)
+        record(name, statistics.median(cold), statistics.median(warm), peak)
+
+    return results
+
+
+def missing_baselines(results: dict, baselines: dict) -> list:
+    """Measured steps that the baseline file has no numbers for."""
+    return [f"{size} {name}" for size, steps in results.items() for name in steps
+            if name not in baselines.get(size, {})]
+
+
+def compare(results: dict, baselines: dict, tolerance: float) -> list:
+    """Steps that got slower or bigger than their baseline by more than the tolerance."""
+    regressions = []
+    for size, steps in results.items():
+        for name, now in steps.items():
+            before = baselines.get(size, {}).get(name)
+            if before is None:
+                continue
+            for metric, slack in (("seconds", SLACK_SECONDS), ("warm_seconds", SLACK_SECONDS), ("peak_mb", SLACK_MB)):
+                limit = max(before[metric] * (1 + tolerance), before[metric] + slack)
+                if now[metric] > limit:
+                    regressions.append(f"{size} {name} {metric}: {now[metric]:.4f} > {before[metric]:.4f}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="10k,100k", help="comma-separated row counts, e.g. 10k,1M,10M")
+    parser.add_argument("--repeat", type=int, default=5, help="cold runs (each on a fresh snapshot) and warm runs per step")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="write these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed relative slowdown")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for size in args.sizes.split(","):
+        results[size.strip()] = bench_size(parse_size(size), max(args.repeat, 1))
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+
+    if args.save_baseline:
+        baselines.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"\n💾 Baseline written to {args.baseline}")
+        return 0
+
+    missing = missing_baselines(results, baselines) if baselines else []
+    if missing:
+        print(f"\n⚠️ No baseline for: {', '.join(missing)} (run with --save-baseline)")
+
+    regressions = compare(results, baselines, args.tolerance)
+    if regressions:
+        print("\n❌ Regressions against baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+
+    print("\n✅ No regressions against baseline" if baselines else "\nNo baseline yet; run with --save-baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Synthetic "Client Data" and "Product Sale" sheets for benchmarking.
+
+Frames come out the way the sheets do: text timestamps in the sheet
+formats, phone numbers written a few different ways, empty strings for
+services that were not done and whole-number bill amounts. History runs
+back HISTORY_DAYS from `now`, so the today / week / month queries have
+rows to work on. Generation is seeded and needs no credentials.
+"""
+import numpy as np
+import pandas as pd
+
+import query
+
+HISTORY_DAYS = 730
+
+EMPLOYEES = ["Asha", "Bina", "Chitra", "Deepa", "Esha", "Farah"]
+PRODUCTS = ["Serum", "Shampoo", "Conditioner", "Face Cream", "Hair Oil",
+            "Sunscreen", "Face Wash", "Hair Mask", "Toner", "Lip Balm"]
+
+
+def _timestamps(rng, rows: int, now) -> pd.Series:
+    """Sorted bill times over the history, during opening hours (10:00-21:00)."""
+    now = pd.Timestamp(now) if now is not None else pd.Timestamp.now()
+    days = rng.integers(0, HISTORY_DAYS, rows)
+    seconds = rng.integers(10 * 3600, 21 * 3600, rows)
+    times = now.normalize() - pd.to_timedelta(days, unit="D") + pd.to_timedelta(seconds, unit="s")
+    return pd.Series(np.sort(times.to_numpy()))
+
+
+def _phones(rng, customers: np.ndarray) -> np.ndarray:
+    """Ten-digit numbers, some written as "+91 ..." or with a leading 0, a few missing."""
+    digits = pd.Series(customers + 9_000_000_000).astype(str)
+    style = rng.integers(0, 10, len(customers))
+    phones = digits.where(style > 1, "+91 " + digits)
+    phones = phones.where(style != 2, "0" + digits)
+    phones = phones.where(style != 3, "")
+    return phones.to_numpy(dtype=object)
+
+
+def client_data(rows: int, seed: int = 0, now=None) -> pd.DataFrame:
+    """`rows` service bills from roughly rows / 8 recurring customers."""
+    rng = np.random.default_rng(seed)
+    # Skewed towards low IDs: a core of regulars plus a long tail of one-off visits
+    count = max(rows // 8, 50)
+    customers = (count * rng.random(rows) ** 2).astype("int64")
+    names = np.array([f"Customer {i}" for i in range(count)], dtype=object)
+
+    frame = pd.DataFrame({
+        "Timestamp": _timestamps(rng, rows, now).dt.strftime("%d/%m/%Y %H:%M:%S"),
+        "Name": names[customers],
+        "Phone Number": _phones(rng, customers),
+        "Bill Amount": rng.integers(100, 5000, rows),
+        "Service done by": rng.choice(EMPLOYEES, rows),
+    })
+    for col in query.SERVICE_COLUMNS:
+        frame[col] = np.where(rng.random(rows) < 0.25, "Yes", "")
+    return frame
+
+
+def product_sale(rows: int, seed: int = 1, now=None) -> pd.DataFrame:
+    """`rows` product sales, with the separate sale "Date" column."""
+    rng = np.random.default_rng(seed)
+    timestamps = _timestamps(rng, rows, now)
+    return pd.DataFrame({
+        "Timestamp": timestamps.dt.strftime("%d/%m/%Y %H:%M:%S"),
+        "Date": timestamps.dt.strftime("%d-%b-%Y"),
+        "Sold by": rng.choice(EMPLOYEES, rows),
+        "Product Name": rng.choice(PRODUCTS, rows),
+        "Bill Amount": rng.integers(100, 1500, rows),
+    })
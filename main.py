@@ -0,0 +1,64 @@
+"""
+Headless precompute of the dashboard, for cron.
+
+    python main.py              # sync the worksheets, run every dashboard query, write snapshots/<n>/
+    python main.py --no-sync    # compute from the worksheets already in the mirror store
+
+    */5 * * * * cd /srv/blsh-dashboard && python main.py >> precompute.log 2>&1
+
+The app publishes the newest snapshot in BLSH_SNAPSHOT_DIR (see
+utils/precompute.py) as soon as its refresh worker notices it, so page
+views only read precomputed results. The sheets connector keeps its delta
+sync state next to the mirror files, so each run only downloads the rows
+appended since the previous one, and a run that finds the mirror unchanged
+keeps the current snapshot instead of writing a copy of it.
+"""
+import argparse
+import sys
+import time
+from datetime import datetime
+
+from utils import mirror_store, precompute
+from utils.snapshot import CLIENT_SHEET, PRODUCT_SHEET, build_snapshot
+
+SHEETS = (CLIENT_SHEET, PRODUCT_SHEET)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--no-sync", action="store_true", help="use the mirror store as it is")
+    parser.add_argument("--out", default=precompute.SNAPSHOT_DIR, help="snapshot directory")
+    parser.add_argument("--keep", type=int, default=precompute.KEEP_SNAPSHOTS, help="snapshots to keep")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if not args.no_sync:
+        mirror_store.sync_worksheets(SHEETS)
+
+    clients, products = (mirror_store.read_worksheet(sheet) for sheet in SHEETS)
+    if clients.empty and products.empty:
+        print("❌ No worksheet data to precompute from")
+        return 1
+
+    sources = {sheet: mirror_store.stored_hash(sheet) for sheet in SHEETS}
+    version = precompute.current_version(sources, args.out)
+    if version is not None:
+        print(f"✅ Snapshot {version} is up to date (checked in {time.perf_counter() - start:.1f}s)")
+        return 0
+
+    versions = [v for v in (mirror_store.mirror_version(sheet) for sheet in SHEETS) if v is not None]
+    as_of = datetime.fromtimestamp(max(versions) / 1e9)
+    snap = build_snapshot(clients.copy(), products.copy(), as_of=as_of)
+
+    try:
+        path = precompute.write_snapshot(snap, clients, products, args.out, args.keep, sources)
+    except FileExistsError as e:
+        print(f"❌ Another precompute run wrote the same version: {e}")
+        return 1
+
+    print(f"✅ Wrote {path} (data as of {as_of:%d %b %Y, %H:%M:%S}) in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
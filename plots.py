@@ -1,15 +1,21 @@
+import os
+
+import numpy as np
 import plotly.express as px
+import plotly.graph_objects as go
 import pandas as pd
 import streamlit as st
 
-# plots.py (Home tab - optional)
-import streamlit as st
+from utils.figure_cache import cached_figure
+from utils.instrumentation import traced
 
-def display_home_metrics(total_sales, customer_count):
-    col1, col2 = st.columns(2)
-    col1.metric("💰 Today's Sales", f"₹{total_sales:,.2f}")
-    col2.metric("👥 Customers Visited Today", f"{customer_count}")
+# 📈 Spend vs visits: WebGL above this many customers, density + outliers above the next
+SCATTER_WEBGL_POINTS = int(os.environ.get("BLSH_SCATTER_WEBGL_POINTS", "1000"))
+SCATTER_DENSITY_POINTS = int(os.environ.get("BLSH_SCATTER_DENSITY_POINTS", "10000"))
+SCATTER_OUTLIERS = int(os.environ.get("BLSH_SCATTER_OUTLIERS", "50"))
+SCATTER_DENSITY_BINS = 60
 
+# plots.py (Home tab - optional)
 def display_home_metrics(total_sales, customer_count, new_clients, repeated_clients):
     col1, col2, col3, col4 = st.columns(4)
     col1.metric("💰 Today's Sales", f"₹{total_sales:,.2f}")
@@ -17,6 +23,8 @@ def display_home_metrics(total_sales, customer_count, new_clients, repeated_clie
     col3.metric("🆕 New Clients", f"{new_clients}")
     col4.metric("🔁 Repeated Clients", f"{repeated_clients}")
 
+@traced("plot")
+@cached_figure
 def plot_annual_incentives(df):
     fig = px.bar(df, x="employee", y="total_incentive", color="year",
                  barmode="group", text="total_incentive",
@@ -28,16 +36,27 @@ def plot_annual_incentives(df):
 
 #-----------------------------------------Tab-2----------------------------------------------------------------
 
-import plotly.express as px
-import streamlit as st
+@cached_figure
+def peak_hours_figure(df):
+    return px.bar(df, x="hour", y="visit_count",  text_auto=True)
 
+@traced("plot")
 def plot_peak_hours(df):
-    fig = px.bar(df, x="hour", y="visit_count",  text_auto=True)
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(peak_hours_figure(df), use_container_width=True)
 
-def plot_weekday_visit_counts(df):
-    """Plot bar chart of visits per weekday (Mon–Sun)."""
-    df["is_weekend"] = df["weekday"].isin(["Saturday", "Sunday"])
+@cached_figure
+def new_clients_figure(df):
+    return px.bar(df, x="period", y="new_clients", text_auto=True)
+
+@traced("plot")
+def plot_new_clients(df):
+    """Bar chart of first-time clients per period."""
+    st.plotly_chart(new_clients_figure(df), use_container_width=True)
+
+@cached_figure
+def weekday_visit_counts_figure(df):
+    # assign, not df[...] =: the frame may be a snapshot's cached query result
+    df = df.assign(is_weekend=df["weekday"].isin(["Saturday", "Sunday"]))
 
     fig = px.bar(
         df,
@@ -56,20 +75,77 @@ def plot_weekday_visit_counts(df):
         title_x=0.5,
         bargap=0.2
     )
+    return fig
+
+@traced("plot")
+def plot_weekday_visit_counts(df):
+    """Plot bar chart of visits per weekday (Mon–Sun)."""
+    st.plotly_chart(weekday_visit_counts_figure(df), use_container_width=True)
 
-    st.plotly_chart(fig, use_container_width=True)
+@cached_figure
+def service_counts_figure(df):
+    return px.bar(df, x="Service", y="count",  text_auto=True)
 
+@traced("plot")
 def plot_service_counts(df):
-    fig = px.bar(df, x="Service", y="count",  text_auto=True)
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(service_counts_figure(df), use_container_width=True)
+
+
+def _scatter_outliers(df, n):
+    """The customers furthest out on any axis: top n by visits, spend and spend per visit."""
+    keep = set()
+    for col in ("visits", "total_spent", "avg_spend_per_visit"):
+        keep.update(df[col].nlargest(n).index)
+    return df.loc[sorted(keep)]
+
+
+def _density_layer(df, bins):
+    """Customer counts binned over visits x total_spent, computed here so only the grid is sent."""
+    x_bins = int(min(bins, df["visits"].max() - df["visits"].min() + 1))
+    counts, x_edges, y_edges = np.histogram2d(df["visits"], df["total_spent"], bins=[x_bins, bins])
+    z = np.where(counts > 0, counts, np.nan).T  # empty cells stay transparent
+    return go.Heatmap(
+        x=(x_edges[:-1] + x_edges[1:]) / 2,
+        y=(y_edges[:-1] + y_edges[1:]) / 2,
+        z=z,
+        colorscale="Blues",
+        colorbar=dict(title="customers"),
+        hovertemplate="visits≈%{x:.0f}<br>spent≈₹%{y:,.0f}<br>%{z:.0f} customers<extra></extra>",
+    )
 
 
-def plot_spend_vs_visits(df):
-    fig = px.scatter(
+@cached_figure
+def spend_vs_visits_figure(df):
+    """Scatter of priced customers, or density + outliers above SCATTER_DENSITY_POINTS."""
+    points = len(df)
+    if points > SCATTER_DENSITY_POINTS:
+        fig = px.scatter(
+            _scatter_outliers(df, SCATTER_OUTLIERS), x="visits", y="total_spent", size="avg_spend_per_visit",
+            hover_name="Name", render_mode="webgl",
+        )
+        fig.add_trace(_density_layer(df, SCATTER_DENSITY_BINS))
+        fig.data = fig.data[-1:] + fig.data[:-1]  # heatmap underneath the outliers
+        return fig
+    return px.scatter(
         df, x="visits", y="total_spent", size="avg_spend_per_visit",
-        hover_name="Name", 
+        hover_name="Name",
+        render_mode="webgl" if points > SCATTER_WEBGL_POINTS else "svg",
     )
-    st.plotly_chart(fig, use_container_width=True)
+
+
+@traced("plot")
+def plot_spend_vs_visits(df):
+    """
+    Spend vs visits per customer, bounded in size however many customers there are.
+
+    Up to SCATTER_WEBGL_POINTS customers draw as an SVG scatter, up to
+    SCATTER_DENSITY_POINTS as a WebGL scatter; beyond that the customers are
+    binned into a density heatmap with only the top outliers drawn as points.
+    """
+    df = df.dropna(subset=["total_spent"])  # customers without a priced bill have no spend to plot
+    if len(df) > SCATTER_DENSITY_POINTS:
+        st.caption(f"{len(df):,} customers: density of all, top outliers as points")
+    st.plotly_chart(spend_vs_visits_figure(df), use_container_width=True)
 
 
 # def plot_employee_performance(df1, df2):
@@ -81,32 +157,39 @@ def plot_spend_vs_visits(df):
 #         fig2 = px.bar(df2, x="employee", y="total_revenue",  text_auto=True)
 #         st.plotly_chart(fig2, use_container_width=True)
 
-import plotly.express as px
-import streamlit as st
+@cached_figure
+def employee_services_figure(df):
+    fig = px.bar(df, x="employee", y="service_count", text_auto=True,
+                 title=None)
+    fig.update_layout(xaxis_title=None, yaxis_title="Services", title_x=0.5)
+    return fig
+
+@cached_figure
+def employee_revenue_bars_figure(df):
+    fig = px.bar(df, x="employee", y="total_revenue", text_auto=True,
+                 title=None)
+    fig.update_layout(xaxis_title=None, yaxis_title="Revenue (₹)", title_x=0.5)
+    return fig
 
+@traced("plot")
 def plot_employee_performance(df1, df2):
     """Show employee rankings: by service count and revenue side-by-side."""
     col1, col2 = st.columns(2)
 
     with col1:
         st.markdown("### Services Rendered by employee")
-        fig1 = px.bar(df1, x="employee", y="service_count", text_auto=True,
-                      title=None)
-        fig1.update_layout(xaxis_title=None, yaxis_title="Services", title_x=0.5)
-        st.plotly_chart(fig1, use_container_width=True)
+        st.plotly_chart(employee_services_figure(df1), use_container_width=True)
 
     with col2:
         st.markdown("### By Revenue Generated employee")
-        fig2 = px.bar(df2, x="employee", y="total_revenue", text_auto=True,
-                      title=None)
-        fig2.update_layout(xaxis_title=None, yaxis_title="Revenue (₹)", title_x=0.5)
-        st.plotly_chart(fig2, use_container_width=True)
+        st.plotly_chart(employee_revenue_bars_figure(df2), use_container_width=True)
 
 #------------------------------------------Tab-3----------------------------------------------------------------
-def plot_sales_by_day(df: pd.DataFrame):
-    """Line chart: total sales by weekday"""
+@cached_figure
+def sales_by_day_figure(df: pd.DataFrame):
     weekday_order = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-    df["day_of_week"] = pd.Categorical(df["day_of_week"], categories=weekday_order, ordered=True)
+    # assign, not df[...] =: the frame may be a snapshot's cached query result
+    df = df.assign(day_of_week=pd.Categorical(df["day_of_week"], categories=weekday_order, ordered=True))
     df = df.sort_values("day_of_week")
 
     fig = px.line(
@@ -124,11 +207,17 @@ def plot_sales_by_day(df: pd.DataFrame):
         title_x=0.5,
         template="plotly_white"
     )
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
 
 
-def plot_top_products(df: pd.DataFrame):
-    """Bar chart: most frequently sold products"""
+@traced("plot")
+def plot_sales_by_day(df: pd.DataFrame):
+    """Line chart: total sales by weekday"""
+    st.plotly_chart(sales_by_day_figure(df), use_container_width=True)
+
+
+@cached_figure
+def top_products_figure(df: pd.DataFrame):
     fig = px.bar(
         df.head(10),
         x="product",
@@ -142,11 +231,17 @@ def plot_top_products(df: pd.DataFrame):
         title_x=0.5,
         template="plotly_white"
     )
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
 
 
-def plot_employee_revenue(df: pd.DataFrame):
-    """Bar chart: employee-wise total revenue"""
+@traced("plot")
+def plot_top_products(df: pd.DataFrame):
+    """Bar chart: most frequently sold products"""
+    st.plotly_chart(top_products_figure(df), use_container_width=True)
+
+
+@cached_figure
+def employee_revenue_figure(df: pd.DataFrame):
     fig = px.bar(
         df,
         x="employee",
@@ -160,11 +255,17 @@ def plot_employee_revenue(df: pd.DataFrame):
         title_x=0.5,
         template="plotly_white"
     )
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
 
 
-def plot_employee_sales(df: pd.DataFrame):
-    """Bar chart: employee-wise total number of products sold"""
+@traced("plot")
+def plot_employee_revenue(df: pd.DataFrame):
+    """Bar chart: employee-wise total revenue"""
+    st.plotly_chart(employee_revenue_figure(df), use_container_width=True)
+
+
+@cached_figure
+def employee_sales_figure(df: pd.DataFrame):
     fig = px.bar(
         df,
         x="employee",
@@ -180,10 +281,15 @@ def plot_employee_sales(df: pd.DataFrame):
         title_x=0.5,
         template="plotly_white"
     )
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
 
-import streamlit as st
 
+@traced("plot")
+def plot_employee_sales(df: pd.DataFrame):
+    """Bar chart: employee-wise total number of products sold"""
+    st.plotly_chart(employee_sales_figure(df), use_container_width=True)
+
+@traced("plot")
 def plot_incentive_by_employee(df):
     """Display incentives earned by each employee as a sortable table."""
     
@@ -200,4 +306,27 @@ def plot_incentive_by_employee(df):
         hide_index=True
     )
 
-#--------------------------------------------------------------------------------------------------------------------------------------------------
\ No newline at end of file
+#--------------------------------------------------------------------------------------------------------------------------------------------------
+
+
+@cached_figure
+def rerun_flame_figure(df):
+    fig = px.bar(
+        df,
+        x="ms",
+        base="start_ms",
+        y="depth",
+        color="kind",
+        orientation="h",
+        text="name",
+        hover_data=["name", "start_ms", "ms"],
+    )
+    fig.update_yaxes(autorange="reversed", dtick=1, title="depth")
+    fig.update_layout(xaxis_title="ms since rerun start", bargap=0.1)
+    return fig
+
+
+@traced("plot")
+def plot_rerun_flame(df):
+    """Flame-style timeline of one rerun: a bar per traced call, nested calls one row down."""
+    st.plotly_chart(rerun_flame_figure(df), use_container_width=True)
@@ -1,750 +1,739 @@
-import duckdb
+import functools
+import itertools
+
 import pandas as pd
-import datetime
-from datetime import datetime
+from dataclasses import dataclass
 
-# --- Home Tab Queries ---
+from utils import periods
+from utils.instrumentation import traced
+from utils.leaderboard import Leaderboard
 
-def today_sales(df):
-    """Calculate total sales for today."""
-    query = """
-        SELECT SUM("Bill Amount") AS total_sales_today
-        FROM df
-        WHERE DATE(Timestamp) = DATE(CURRENT_DATE)
-    """
-    return duckdb.query(query).df()
+# All queries run against a `Snapshot` (see utils/snapshot.py), which holds
+# one DuckDB connection with the bills, preprocessed with compact=True,
+# registered as tables:
+#   clients      -> "Client Data"
+#   products     -> "Product Sale"
+#   daily_rollup -> clients aggregated per (day, employee, hour), see utils/rollup.py
+#   customers    -> one row per "Customer ID" in clients, see utils/customers.py
+#   customer_months -> visits and spend per (month, customer), see utils/leaderboard.py
 
+SERVICE_COLUMNS = ["Waxing", "Facial", "De-tan", "Pedicure", "Manicure",
+                   "Bleaching", "Wash", "Massage", "Threading", "Hair Cut"]
 
-def today_customer_count(df):
-    """Count of distinct customers visited today."""
-    query = """
-        SELECT COUNT(DISTINCT Name) AS customers_today
-        FROM df
-        WHERE DATE(Timestamp) = DATE(CURRENT_DATE)
-    """
-    return duckdb.query(query).df()
+# Repetitive text columns stored as categories by preprocess_data(compact=True)
+CATEGORY_COLUMNS = ["Name", "Phone Number", "Service done by", "Sold by", "Product Name"]
 
-# ========== 🧾 TIME-BASED SERVICE QUERIES ==========
+MONTHS = ["January", "February", "March", "April", "May", "June", "July",
+          "August", "September", "October", "November", "December"]
 
-def weekly_service_sales(df):
-    """Total service sales for the current week."""
-    query = """
-        SELECT SUM("Bill Amount") AS weekly_sales
-        FROM df
-        WHERE strftime('%W', Timestamp) = strftime('%W', CURRENT_DATE)
-          AND strftime('%Y', Timestamp) = strftime('%Y', CURRENT_DATE)
-    """
-    return duckdb.query(query).df()
+# Longest phone number (E.164); longer digit runs are not a single phone
+MAX_PHONE_DIGITS = 15
 
-def weekly_service_count(df):
-    """Total number of distinct services (visits) for the current week."""
-    query = """
-        SELECT COUNT(DISTINCT "Phone Number" || DATE(Timestamp)) AS weekly_service_count
-        FROM df
-        WHERE strftime('%W', Timestamp) = strftime('%W', CURRENT_DATE)
-          AND strftime('%Y', Timestamp) = strftime('%Y', CURRENT_DATE)
-    """
-    return duckdb.query(query).df()
+# Periods new_clients_by_period can group first visits by
+PERIOD_UNITS = ("week", "month")
 
 
-def monthly_service_sales(df):
-    """Total service sales for the current month."""
-    query = """
-        SELECT SUM("Bill Amount") AS monthly_sales
-        FROM df
-        WHERE strftime('%m', Timestamp) = strftime('%m', CURRENT_DATE)
-          AND strftime('%Y', Timestamp) = strftime('%Y', CURRENT_DATE)
+def _within(name, column="Timestamp"):
+    """Range predicate for a period bound with periods.as_params(name=...)."""
+    return f"{column} >= ${name}_start AND {column} < ${name}_end"
+
+
+@dataclass(frozen=True)
+class TableQuery:
     """
-    return duckdb.query(query).df()
+    A SELECT (without ORDER BY) that tables page through in DuckDB.
 
-def monthly_service_count(df):
-    """Total number of distinct services (visits) for the current month."""
-    query = """
-        SELECT COUNT(DISTINCT "Phone Number" || DATE(Timestamp)) AS monthly_service_count
-        FROM df
-        WHERE strftime('%m', Timestamp) = strftime('%m', CURRENT_DATE)
-          AND strftime('%Y', Timestamp) = strftime('%Y', CURRENT_DATE)
+    Columns starting with "_" are kept out of the displayed columns; the
+    default ORDER BY may use them (e.g. a "_row" position).
     """
-    return duckdb.query(query).df()
+    sql: str
+    order_by: str
+    params: dict = None
 
+    def ordered(self) -> str:
+        return f"{self.sql} ORDER BY {self.order_by}"
 
-def prev_week_service_sales(df):
-    """Total service sales for the previous week."""
-    query = """
-        SELECT SUM("Bill Amount") AS prev_week_sales
-        FROM df
-        WHERE strftime('%W', Timestamp) = CAST(strftime('%W', CURRENT_DATE) AS INTEGER) - 1
-          AND strftime('%Y', Timestamp) = strftime('%Y', CURRENT_DATE)
+
+def result_key(name, args=(), kwargs=None, day=None):
+    """Snapshot memo key of a dashboard query result (see per_snapshot)."""
+    return ("result", name, tuple(args), tuple(sorted((kwargs or {}).items())), day or periods.day().start)
+
+
+def per_snapshot(func):
     """
-    return duckdb.query(query).df()
+    Compute a dashboard query once per snapshot, day and arguments.
 
-def prev_week_service_count(df):
-    """Total number of distinct services (visits) for the previous week."""
-    query = """
-        SELECT COUNT(DISTINCT "Phone Number" || DATE(Timestamp)) AS prev_week_service_count
-        FROM df
-        WHERE strftime('%W', Timestamp) = CAST(strftime('%W', CURRENT_DATE) AS INTEGER) - 1
-          AND strftime('%Y', Timestamp) = strftime('%Y', CURRENT_DATE)
+    Results are relative to today at most, so they only change with the data
+    or the date. A precomputed snapshot (utils/precompute.py) arrives with
+    these results already filled in. Frames are copied out, so callers may
+    modify what they get.
     """
-    return duckdb.query(query).df()
+    @functools.wraps(func)
+    def wrapper(snap, *args, **kwargs):
+        result = snap.cached(result_key(func.__name__, args, kwargs), lambda: func(snap, *args, **kwargs))
+        return result.copy() if isinstance(result, (pd.DataFrame, pd.Series)) else result
+    return wrapper
 
 
-def prev_month_service_sales(df):
-    """Total service sales for the previous month."""
-    query = """
-        SELECT SUM("Bill Amount") AS prev_month_sales
-        FROM df
-        WHERE strftime('%m', Timestamp) = CAST(strftime('%m', CURRENT_DATE) AS INTEGER) - 1
-          AND strftime('%Y', Timestamp) = strftime('%Y', CURRENT_DATE)
-    """
-    return duckdb.query(query).df()
+def month_options(snap) -> list:
+    """Choices of the month selectors: "All months" plus every month name with bills."""
+    return ["All months"] + sorted(snap.clients["Month"].dropna().unique().tolist())
 
-def prev_month_service_count(df):
-    """Total number of distinct services (visits) for the previous month."""
-    query = """
-        SELECT COUNT(DISTINCT "Phone Number" || DATE(Timestamp)) AS prev_month_service_count
-        FROM df
-        WHERE strftime('%m', Timestamp) = CAST(strftime('%m', CURRENT_DATE) AS INTEGER) - 1
-          AND strftime('%Y', Timestamp) = strftime('%Y', CURRENT_DATE)
+
+# --- Home Tab Queries ---
+
+@dataclass(frozen=True)
+class ServiceKPIs:
+    """All Home tab service KPIs, computed in a single pass."""
+    sales_today: float
+    customers_today: int
+    weekly_sales: float
+    weekly_visits: int
+    monthly_sales: float
+    monthly_visits: int
+    prev_week_sales: float
+    prev_week_visits: int
+    prev_month_sales: float
+    prev_month_visits: int
+    total_services: int
+
+
+@dataclass(frozen=True)
+class ProductKPIs:
+    """All Home tab product KPIs, computed in a single pass."""
+    total_revenue: float
+    total_sold: int
+    sold_today: int
+    sold_last_week: int
+    sold_last_month: int
+
+
+@traced("query")
+@per_snapshot
+def service_kpis(snap) -> ServiceKPIs:
+    """
+    Today / week / month / previous week / previous month sales and visits.
+
+    Every KPI is a conditional aggregate over the same scan, filtered by
+    calendar ranges. A visit is a distinct customer per day.
+    """
+    if snap.clients.empty:
+        return ServiceKPIs(0.0, 0, 0.0, 0, 0.0, 0, 0.0, 0, 0.0, 0, 0)
+
+    query = f"""
+        WITH bills AS (
+            SELECT
+                Timestamp,
+                "Bill Amount" AS amount,
+                "Customer ID" AS customer,
+                CASE WHEN "Customer ID" IS NOT NULL THEN ("Customer ID", DATE(Timestamp)) END AS visit
+            FROM clients
+        )
+        SELECT
+            COALESCE(SUM(amount) FILTER (WHERE {_within("today")}), 0),
+            COUNT(DISTINCT customer) FILTER (WHERE {_within("today")}),
+            COALESCE(SUM(amount) FILTER (WHERE {_within("week")}), 0),
+            COUNT(DISTINCT visit) FILTER (WHERE {_within("week")}),
+            COALESCE(SUM(amount) FILTER (WHERE {_within("month")}), 0),
+            COUNT(DISTINCT visit) FILTER (WHERE {_within("month")}),
+            COALESCE(SUM(amount) FILTER (WHERE {_within("prev_week")}), 0),
+            COUNT(DISTINCT visit) FILTER (WHERE {_within("prev_week")}),
+            COALESCE(SUM(amount) FILTER (WHERE {_within("prev_month")}), 0),
+            COUNT(DISTINCT visit) FILTER (WHERE {_within("prev_month")}),
+            COUNT(amount)
+        FROM bills
+    """
+    params = periods.as_params(
+        today=periods.day(),
+        week=periods.week(),
+        month=periods.month(),
+        prev_week=periods.week(-1),
+        prev_month=periods.month(-1),
+    )
+    return ServiceKPIs(*snap.fetchone(query, params))
+
+
+@traced("query")
+@per_snapshot
+def product_kpis(snap) -> ProductKPIs:
+    """Total product revenue and units sold overall, today, last 7 and last 30 days."""
+    if snap.products.empty:
+        return ProductKPIs(0.0, 0, 0, 0, 0)
+
+    query = f"""
+        SELECT
+            COALESCE(SUM("Bill Amount"), 0),
+            COUNT(*),
+            COUNT(*) FILTER (WHERE {_within("today")}),
+            COUNT(*) FILTER (WHERE {_within("last_week")}),
+            COUNT(*) FILTER (WHERE {_within("last_month")})
+        FROM products
+    """
+    params = periods.as_params(
+        today=periods.day(),
+        last_week=periods.last_days(7),
+        last_month=periods.last_days(30),
+    )
+    return ProductKPIs(*snap.fetchone(query, params))
+
+
+# --- Home Tab: New vs Repeated Clients ---
+@traced("query")
+@per_snapshot
+def new_and_repeated_clients(snap, period=None):
+    """
+    Returns count of new clients and repeated clients for today (or `period`).
+    New clients: first visit falls inside the period
+    Repeated clients: first visit was before the period
     """
-    return duckdb.query(query).df()
+    period = period or periods.day()
+    query = f"""
+        SELECT
+            COUNT(*) FILTER (WHERE c.first_visit >= $period_start) AS new_clients,
+            COUNT(*) FILTER (WHERE c.first_visit < $period_start) AS repeated_clients
+        FROM customers c
+        WHERE c.customer_id IN (
+            SELECT "Customer ID" FROM clients WHERE {_within("period")}
+        )
+    """
+    return snap.fetchone(query, periods.as_params(period=period))
+
+
+@traced("query")
+@per_snapshot
+def new_clients_by_period(snap, unit="month"):
+    """Number of first-time clients per week or month, over the whole history."""
+    if unit not in PERIOD_UNITS:
+        raise ValueError(f"Unknown period unit '{unit}' (expected one of {', '.join(PERIOD_UNITS)})")
 
-def total_service_count(df):
-    """Total number of services completed overall."""
     query = """
-        SELECT COUNT(*) AS total_services
-        FROM df
-        WHERE "Bill Amount" IS NOT NULL
+        SELECT date_trunc($unit, first_visit) AS period, COUNT(*) AS new_clients
+        FROM customers
+        WHERE first_visit IS NOT NULL
+        GROUP BY period
+        ORDER BY period
     """
-    return duckdb.query(query).df()
+    return snap.sql(query, {"unit": unit})
 
-# --- Home Tab: New vs Repeated Clients ---
-def new_and_repeated_clients(df):
-    """
-    Returns count of new clients and repeated clients for today.
-    New clients: first-time visits (phone number not seen before today)
-    Repeated clients: have previous visits before today
+
+#-----------------------------------------------Tab-2--------------------------------------------------------------------------------------
+
+def normalize_phone(phones: pd.Series) -> pd.Series:
     """
-    df['Date_only'] = df['Timestamp'].dt.date
-    today = pd.Timestamp.now().date()
+    Digits-only phone numbers as integers, without the +91 / leading 0 prefix.
 
-    # All records before today
-    past_df = df[df['Date_only'] < today]
+    Cells with more digits than a phone number can have (two numbers in one
+    cell, a pasted ID) get no key rather than an overflowed one.
+    """
+    digits = phones.astype("string").str.replace(r"\D", "", regex=True)
+    digits = digits.mask(digits.str.len() > MAX_PHONE_DIGITS)
+    digits = digits.mask((digits.str.len() == 12) & digits.str.startswith("91"), digits.str[2:])
+    digits = digits.mask((digits.str.len() == 11) & digits.str.startswith("0"), digits.str[1:])
+    return pd.to_numeric(digits.replace("", pd.NA), errors="coerce").astype("Int64")
 
-    # Today's records
-    today_df = df[df['Date_only'] == today]
 
-    # New clients: phone numbers not in past records
-    new_clients = today_df[~today_df['Phone Number'].isin(past_df['Phone Number'].unique())]
+def _compact(df):
+    """Shrink the preprocessed frame: categories, boolean service flags, numeric keys."""
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
 
-    # Repeated clients: phone numbers exist in past records
-    repeated_clients = today_df[today_df['Phone Number'].isin(past_df['Phone Number'].unique())]
+    for col in SERVICE_COLUMNS:
+        if col in df.columns and df[col].dtype != bool:
+            df[col] = (df[col].astype("string").str.strip().fillna("") != "").astype(bool)
 
-    return len(new_clients), len(repeated_clients)
+    if "Bill Amount" in df.columns:
+        df["Bill Amount"] = pd.to_numeric(df["Bill Amount"], errors="coerce").astype("float64")
+    if "Phone Number" in df.columns:
+        df["Phone Key"] = normalize_phone(df["Phone Number"])
 
+    df["Month"] = pd.Categorical(df["Month"], categories=MONTHS, ordered=True)
+    df["Week"] = df["Week"].astype("UInt8")
+    df["Year"] = df["Year"].astype("UInt16")
+    return df
 
 
-#-----------------------------------------------Tab-2--------------------------------------------------------------------------------------
+@traced("preprocess")
+def preprocess_data(df, compact=False):
+    """
+    Convert Timestamp string to datetime and add useful columns.
 
-def preprocess_data(df):
-    """Convert Timestamp string to datetime and add useful columns."""
+    With compact=True the frame is also shrunk for the snapshot: "Date" is
+    datetime64, names/employees/products/months are categorical, service
+    columns become boolean flags and a normalized integer "Phone Key" is added.
+    """
     if df.empty:
         return df
 
     # Convert string to datetime
     df["Timestamp"] = pd.to_datetime(df["Timestamp"], format="%d/%m/%Y %H:%M:%S", errors="coerce")
 
-    # Extract Date, Month, Week, Year
-    df["Date"] = df["Timestamp"].dt.date
+    # Extract Date, Month, Week, Year. "Product Sale" records the sale date
+    # in its own "Date" column (e.g. 05-Oct-2025); keep it where it parses.
+    day = df["Timestamp"].dt.normalize()
+    if "Date" in df.columns:
+        day = pd.to_datetime(df["Date"], format="%d-%b-%Y", errors="coerce").fillna(day)
+    df["Date"] = day if compact else day.dt.date
     df["Month"] = df["Timestamp"].dt.month_name()
     df["Week"] = df["Timestamp"].dt.isocalendar().week
     df["Year"] = df["Timestamp"].dt.year
 
-    return df
+    return _compact(df) if compact else df
 
 
-
-def cumulative_sales(df):
+@traced("query")
+@per_snapshot
+def cumulative_sales(snap):
     """Cumulative sales for current month and YTD."""
-    query = """
+    query = f"""
         SELECT
-            SUM(CASE WHEN strftime('%m', Timestamp) = strftime('%m', current_timestamp) THEN "Bill Amount" ELSE 0 END) AS month_sales,
-            SUM(CASE WHEN strftime('%Y', Timestamp) = strftime('%Y', current_timestamp) THEN "Bill Amount" ELSE 0 END) AS year_sales
-        FROM df
+            COALESCE(SUM(amount) FILTER (WHERE {_within("month", "day")}), 0) AS month_sales,
+            COALESCE(SUM(amount), 0) AS year_sales
+        FROM daily_rollup
+        WHERE {_within("ytd", "day")}
     """
-    return duckdb.query(query).df()
+    return snap.sql(query, periods.as_params(month=periods.month(), ytd=periods.year_to_date()))
 
 
-def incentive_table(df):
-    """Employee incentive (1% of bill)."""
-    query = """
-        SELECT "Service done by" AS employee,
-               SUM("Bill Amount") AS total_sales,
-               ROUND(SUM("Bill Amount") * 0.01, 2) AS incentive
-        FROM df
-        GROUP BY employee
-        ORDER BY total_sales DESC
+INCENTIVES = TableQuery(
     """
-    return duckdb.query(query).df()
+        SELECT employee,
+               SUM(amount) AS total_sales,
+               ROUND(SUM(amount) * 0.01, 2) AS incentive
+        FROM daily_rollup
+        GROUP BY employee
+    """,
+    order_by="total_sales DESC, employee",
+)
 
 
-def performance_table(df, selected_month=None):
-    """Weekly customer count for past 3 months with month filter."""
-    if selected_month and selected_month != "All months":
-        df = df[df["Month"] == selected_month]
+@traced("query")
+@per_snapshot
+def incentive_table(snap):
+    """Employee incentive (1% of bill)."""
+    return snap.sql(INCENTIVES.ordered())
 
-    query = """
-        SELECT 
+
+def _performance_by_month(snap, window):
+    """Weekly customer counts in `window`, split per month plus "All months"."""
+    query = f"""
+        SELECT
             Year,
             Month,
             Week,
-            COUNT(DISTINCT Name) AS customer_visits
-        FROM df
-        WHERE CAST(Timestamp AS TIMESTAMP) >= (CURRENT_TIMESTAMP - INTERVAL '3 months')
+            COUNT(DISTINCT "Customer ID") AS customer_visits
+        FROM clients
+        WHERE {_within("recent")}
         GROUP BY Year, Month, Week
         ORDER BY Year DESC, Month DESC, Week
     """
-    return duckdb.query(query).df()
+    full = snap.sql(query, periods.as_params(recent=window))
+
+    # Every (Year, Month, Week) group belongs to one month, so a month's
+    # table is just its slice of the full result.
+    tables = {
+        month: rows.reset_index(drop=True)
+        for month, rows in full.groupby("Month", sort=False)
+    }
+    tables["All months"] = full
+    return tables
+
+
+@traced("query")
+@per_snapshot
+def performance_table(snap, selected_month=None):
+    """Weekly customer count for past 3 months with month filter."""
+    window = periods.trailing_months(3, now=periods.day().start)
+    tables = snap.cached(("performance_table", window), lambda: _performance_by_month(snap, window))
 
+    full = tables["All months"]
+    return tables.get(selected_month or "All months", full.iloc[0:0]).copy()
 
 
-def peak_hours(df):
+def _derived_table(snap, name, key, compute):
+    """Register a per-snapshot derived frame as table `name`, with its row order as "_row"."""
+    def register():
+        snap.register(name, compute().reset_index(drop=True).rename_axis("_row").reset_index())
+        return name
+    return snap.cached(("table", name, key), register)
+
+
+def performance_source(snap, selected_month=None) -> TableQuery:
+    """performance_table() as a TableQuery over the per-snapshot weekly counts."""
+    window = periods.trailing_months(3, now=periods.day().start)
+    tables = snap.cached(("performance_table", window), lambda: _performance_by_month(snap, window))
+    table = _derived_table(snap, "weekly_performance", window, lambda: tables["All months"])
+    month = selected_month or "All months"
+    where = "" if month == "All months" else "WHERE Month = $month"
+    return TableQuery(f"SELECT * FROM {table} {where}", order_by="_row",
+                      params={"month": month} if where else None)
+
+
+@traced("query")
+@per_snapshot
+def peak_hours(snap):
     """Find busiest hours."""
     query = """
-        SELECT strftime('%H', Timestamp) AS hour, COUNT(*) AS visit_count
-        FROM df
-        GROUP BY hour
+        SELECT lpad(CAST(hour AS VARCHAR), 2, '0') AS hour, CAST(SUM(bills) AS BIGINT) AS visit_count
+        FROM daily_rollup
+        GROUP BY 1
         ORDER BY visit_count DESC
     """
-    return duckdb.query(query).df()
+    return snap.sql(query)
 
 
-def weekday_visit_counts(df):
+@traced("query")
+@per_snapshot
+def weekday_visit_counts(snap):
     """Return visit counts for each weekday (ordered Monday → Sunday)."""
     query = """
-        SELECT 
-            strftime('%A', Timestamp) AS weekday,
-            COUNT(*) AS visit_count,
-            CASE 
-                WHEN strftime('%w', Timestamp) = '0' THEN 7  -- Sunday as 7
-                ELSE CAST(strftime('%w', Timestamp) AS INTEGER)
-            END AS weekday_num
-        FROM df
+        SELECT
+            dayname(day) AS weekday,
+            CAST(SUM(bills) AS BIGINT) AS visit_count,
+            isodow(day) AS weekday_num  -- Monday 1 ... Sunday 7
+        FROM daily_rollup
         GROUP BY weekday, weekday_num
         ORDER BY weekday_num
     """
-    result = duckdb.query(query).df()
+    result = snap.sql(query)
     return result[["weekday", "visit_count"]]
 
 
-def service_count(df, selected_month=None):
-    """Service-wise usage count."""
-    if selected_month and selected_month != "All months":
-        df = df[df["Month"] == selected_month]
-    melted = df.melt(
-        id_vars=["Name", "Timestamp"],
-        value_vars=["Waxing", "Facial", "De-tan", "Pedicure", "Manicure",
-                    "Bleaching", "Wash", "Massage", "Threading", "Hair Cut"],
-        var_name="Service",
-        value_name="Used"
-    )
-    melted = melted[melted["Used"].astype(str).str.strip() != ""]
-    query = """
-        SELECT Service, COUNT(*) AS count
-        FROM melted
-        GROUP BY Service
-        ORDER BY count DESC
-    """
-    return duckdb.query(query).df()
-
-
-# def top_clients(df):
-#     """Top 20 clients by visits."""
-#     query = """
-#         SELECT Name, COUNT(*) AS visits
-#         FROM df
-#         GROUP BY Name
-#         ORDER BY visits DESC
-#         LIMIT 20
-#     """
-#     return duckdb.query(query).df()
-
-
-# def top_spenders(df):
-#     """Top 10 customers by spending."""
-#     query = """
-#         SELECT Name, SUM("Bill Amount") AS total_spent
-#         FROM df
-#         GROUP BY Name
-#         ORDER BY total_spent DESC
-#         LIMIT 10
-#     """
-#     return duckdb.query(query).df()
-
-
-# def top_clients_spend_visits(df):
-#     """Top 20 clients by total spending with their visit counts."""
-#     query = """
-#         SELECT 
-#             Name,
-#             COUNT(*) AS visits,
-#             SUM("Bill Amount") AS total_spent
-#         FROM df
-#         GROUP BY Name
-#         ORDER BY total_spent DESC
-#         LIMIT 20
-#     """
-#     result = duckdb.query(query).df()
-#     return result
-
-
-def top_clients_spend_visits(df):
-    """Top 20 clients by total spending with their visit counts (unique by phone number)."""
-    query = """
-        SELECT 
-            "Phone Number" AS phone_number,
-            ANY_VALUE(Name) AS name,          -- Pick any one representative name for display
-            COUNT(*) AS visits,
-            SUM("Bill Amount") AS total_spent
-        FROM df
-        WHERE "Phone Number" IS NOT NULL
-        GROUP BY "Phone Number"
-        ORDER BY total_spent DESC
-        LIMIT 20
-    """
-    result = duckdb.query(query).df()
-    return result[["phone_number", "name", "visits", "total_spent"]]
-
-import duckdb
-
-def least_clients_spend_visits(df):
-    """Bottom 20 clients by total spending with their visit counts (unique by phone number)."""
-    query = """
-        SELECT 
-            "Phone Number" AS phone_number,
-            ANY_VALUE(Name) AS name,          -- representative customer name
-            COUNT(*) AS visits,
-            SUM("Bill Amount") AS total_spent
-        FROM df
-        WHERE "Phone Number" IS NOT NULL
-        GROUP BY "Phone Number"
-        HAVING total_spent IS NOT NULL
-        ORDER BY total_spent ASC
-        LIMIT 20
-    """
-    result = duckdb.query(query).df()
-    return result[["phone_number", "name", "visits", "total_spent"]]
-
-
-def spend_vs_visits(df):
-    """Customer spend vs visits."""
+@traced("query")
+@per_snapshot
+def weekday_visits(snap):
+    """Visits per weekday."""
     query = """
-        SELECT Name,
-               COUNT(*) AS visits,
-               SUM("Bill Amount") AS total_spent,
-               ROUND(SUM("Bill Amount") / COUNT(*), 2) AS avg_spend_per_visit
-        FROM df
-        GROUP BY Name
-        ORDER BY total_spent DESC
+        SELECT dayname(day) AS weekday, CAST(SUM(bills) AS BIGINT) AS visits
+        FROM daily_rollup
+        GROUP BY weekday
+        ORDER BY visits DESC
     """
-    return duckdb.query(query).df()
+    return snap.sql(query)
 
 
-# def days_since_last_visit(df):
-#     """Days since customer's last visit."""
-#     latest = df.groupby("Name")["Timestamp"].max().reset_index()
-#     latest["Days Since Last Visit"] = (pd.Timestamp.now() - latest["Timestamp"]).dt.days
-#     latest = latest.rename(columns={"Timestamp": "Last Visit Date"})
-#     return latest.sort_values(by="Days Since Last Visit", ascending=False)
+@traced("query")
+@per_snapshot
+def service_count(snap, selected_month=None):
+    """Service-wise usage count."""
+    tables = snap.cached("service_count", snap.service_usage.counts_by_month)
 
-def days_since_last_visit(df):
-    """
-    Days since customer's last visit (unique by phone number + date).
-    Keeps only the latest bill per day and per customer.
-    """
-    query = """
-        WITH cleaned AS (
-            SELECT 
-                TRIM(REPLACE(REPLACE(REPLACE(CAST("Phone Number" AS VARCHAR), ' ', ''), '+91', ''), '-', '')) AS phone_clean,
-                Name,
-                Timestamp
-            FROM df
-            WHERE "Phone Number" IS NOT NULL
-        ),
-        ranked_bills AS (
-            SELECT 
-                phone_clean AS "Phone Number",
-                Name AS Customer_Name,
-                DATE(Timestamp) AS visit_date,
-                Timestamp,
-                ROW_NUMBER() OVER (
-                    PARTITION BY phone_clean, DATE(Timestamp)
-                    ORDER BY Timestamp DESC
-                ) AS rn
-            FROM cleaned
-        ),
-        latest_daily_bill AS (
-            SELECT 
-                "Phone Number",
-                Customer_Name,
-                visit_date,
-                Timestamp AS Last_Bill_Time
-            FROM ranked_bills
-            WHERE rn = 1
-        ),
-        latest_visit_per_customer AS (
-            SELECT 
-                "Phone Number",
-                ANY_VALUE(Customer_Name) AS Customer_Name,
-                MAX(visit_date) AS Last_Visit_Date
-            FROM latest_daily_bill
-            GROUP BY "Phone Number"
-        )
-        SELECT 
-            "Phone Number",
-            Customer_Name,
-            Last_Visit_Date,
-            DATE_DIFF('day', Last_Visit_Date, NOW()) AS "Days Since Last Visit"
-        FROM latest_visit_per_customer
-        ORDER BY "Days Since Last Visit" DESC
-    """
-    result = duckdb.query(query).df()
-    return result
-
-def employee_service_ranking(df):
-    """Employee by number of services."""
-    query = """
-        SELECT "Service done by" AS employee, COUNT(*) AS service_count
-        FROM df
-        GROUP BY employee
-        ORDER BY service_count DESC
-    """
-    return duckdb.query(query).df()
+    full = tables["All months"]
+    return tables.get(selected_month or "All months", full.iloc[0:0]).copy()
 
 
-def employee_revenue_ranking(df):
-    """Employee by total revenue."""
-    query = """
-        SELECT "Service done by" AS employee, SUM("Bill Amount") AS total_revenue
-        FROM df
-        GROUP BY employee
-        ORDER BY total_revenue DESC
+@traced("query")
+def customer_leaderboard(snap, months=None, phone_only=False) -> Leaderboard:
     """
-    return duckdb.query(query).df()
+    Customers ranked by spend over the last `months` calendar months
+    (including this one), or over all time when `months` is None.
 
+    Ranked once per snapshot and window; top/bottom k are then slices.
+    """
+    where = []
+    params = {}
+    if months:
+        where.append("m.month >= $since")
+        params["since"] = periods.month(1 - months).start
+    if phone_only:
+        where.append("c.phone IS NOT NULL")
 
-def unique_service_counts(df, selected_month=None):
-    """Unique service types."""
-    return service_count(df, selected_month)
+    query = f"""
+        SELECT
+            c.customer_id,
+            c.phone,
+            c.name,
+            CAST(SUM(m.visits) AS BIGINT) AS visits,
+            CASE WHEN SUM(m.priced) > 0 THEN SUM(m.total_spent) END AS total_spent
+        FROM customer_months m
+        JOIN customers c USING (customer_id)
+        {"WHERE " + " AND ".join(where) if where else ""}
+        GROUP BY c.customer_id, c.phone, c.name
+        ORDER BY total_spent DESC NULLS LAST, visits DESC, c.customer_id
+    """
+    key = ("leaderboard", params.get("since"), phone_only)
+    return snap.cached(key, lambda: Leaderboard(snap.sql(query, params or None)))
+
+
+@traced("query")
+@per_snapshot
+def top_clients(snap, k=20):
+    """Top 20 clients by visits."""
+    query = """
+        SELECT c.name AS Name, CAST(SUM(m.visits) AS BIGINT) AS visits
+        FROM customer_months m
+        JOIN customers c USING (customer_id)
+        GROUP BY c.customer_id, c.name
+        ORDER BY visits DESC
+        LIMIT $k
+    """
+    return snap.sql(query, {"k": k})
 
-#------------------------------------------Tab-2--------------------------------------------------------------------------------------
 
-def preprocess_data(df):
-    """Convert timestamp and add useful columns."""
-    if df.empty:
-        return df
+@traced("query")
+@per_snapshot
+def top_spenders(snap, k=10, months=None):
+    """Top 10 customers by spending."""
+    top = customer_leaderboard(snap, months).top(k)
+    return top[["name", "total_spent"]].rename(columns={"name": "Name"})
 
-    # Convert Timestamp to datetime
-    df["Timestamp"] = pd.to_datetime(df["Timestamp"], format="%d/%m/%Y %H:%M:%S", errors="coerce")
 
-    # Extract Date, Month, Week, and Year
-    df["Date"] = df["Timestamp"].dt.date
-    df["Month"] = df["Timestamp"].dt.month_name()
-    df["Week"] = df["Timestamp"].dt.isocalendar().week
-    df["Year"] = df["Timestamp"].dt.year
+@traced("query")
+@per_snapshot
+def top_clients_spend_visits(snap, k=20, months=None):
+    """Top 20 clients by total spending with their visit counts (unique by phone number)."""
+    top = customer_leaderboard(snap, months, phone_only=True).top(k)
+    return top[["phone", "name", "visits", "total_spent"]].rename(columns={"phone": "phone_number"})
 
-    return df
 
+@traced("query")
+@per_snapshot
+def least_clients_spend_visits(snap, k=20, months=None):
+    """Bottom 20 clients by total spending with their visit counts (unique by phone number)."""
+    bottom = customer_leaderboard(snap, months, phone_only=True).bottom(k)
+    return bottom[["phone", "name", "visits", "total_spent"]].rename(columns={"phone": "phone_number"})
 
-def cumulative_sales(df):
-    """Cumulative sales for current month and YTD."""
-    query = """
-        SELECT
-            SUM(CASE WHEN strftime(CAST(Timestamp AS TIMESTAMP), '%m') = strftime(current_timestamp, '%m') THEN "Bill Amount" ELSE 0 END) AS month_sales,
-            SUM(CASE WHEN strftime(CAST(Timestamp AS TIMESTAMP), '%Y') = strftime(current_timestamp, '%Y') THEN "Bill Amount" ELSE 0 END) AS year_sales
-        FROM df
-    """
-    return duckdb.query(query).df()
 
+@traced("query")
+@per_snapshot
+def spend_vs_visits(snap, months=None):
+    """Customer spend vs visits."""
+    ranked = customer_leaderboard(snap, months).ranked
+    return pd.DataFrame({
+        "Name": ranked["name"],
+        "visits": ranked["visits"],
+        "total_spent": ranked["total_spent"],
+        "avg_spend_per_visit": (ranked["total_spent"] / ranked["visits"]).round(2),
+    })
 
 
-def incentive_table(df):
-    """Employee incentive (1% of bill)."""
+DAYS_SINCE_LAST_VISIT = TableQuery(
+    """
+        SELECT
+            c.phone AS "Phone Number",
+            c.name AS Customer_Name,
+            b.Last_Visit_Date,
+            DATE_DIFF('day', b.Last_Visit_Date, NOW()) AS "Days Since Last Visit"
+        FROM (
+            SELECT "Customer ID" AS customer_id, MAX(DATE(Timestamp)) AS Last_Visit_Date
+            FROM clients
+            WHERE "Customer ID" IS NOT NULL
+            GROUP BY "Customer ID"
+        ) b
+        JOIN customers c USING (customer_id)
+        WHERE c.phone IS NOT NULL
+    """,
+    order_by='"Days Since Last Visit" DESC, "Phone Number"',  # phones are unique: a stable page order
+)
+
+
+@traced("query")
+@per_snapshot
+def days_since_last_visit(snap):
+    """Days since each customer's last visit (unique by normalized phone number)."""
+    return snap.sql(DAYS_SINCE_LAST_VISIT.ordered())
+
+
+@traced("query")
+@per_snapshot
+def employee_service_ranking(snap):
+    """Employee by number of services."""
     query = """
-        SELECT "Service done by" AS employee,
-               SUM("Bill Amount") AS total_sales,
-               ROUND(SUM("Bill Amount") * 0.01, 2) AS incentive
-        FROM df
+        SELECT employee, CAST(SUM(bills) AS BIGINT) AS service_count
+        FROM daily_rollup
         GROUP BY employee
-        ORDER BY total_sales DESC
+        ORDER BY service_count DESC
     """
-    return duckdb.query(query).df()
+    return snap.sql(query)
 
-def performance_table(df, selected_month=None):
-    """Weekly customer count for past 3 months with month filter."""
-    if selected_month and selected_month != "All months":
-        df = df[df["Month"] == selected_month]
 
+@traced("query")
+@per_snapshot
+def employee_revenue_ranking(snap):
+    """Employee by total revenue."""
     query = """
-        SELECT 
-            Year, 
-            Month, 
-            Week, 
-            COUNT(DISTINCT Name) AS customer_visits
-        FROM df
-        WHERE CAST(Timestamp AS TIMESTAMP WITH TIME ZONE) >= (current_timestamp - INTERVAL '3 months')
-        GROUP BY Year, Month, Week
-        ORDER BY Year DESC, Month DESC, Week
+        SELECT employee, SUM(amount) AS total_revenue
+        FROM daily_rollup
+        GROUP BY employee
+        ORDER BY total_revenue DESC
     """
-    return duckdb.query(query).df()
+    return snap.sql(query)
 
 
+@traced("query")
+@per_snapshot
+def unique_service_counts(snap, selected_month=None):
+    """Unique service types."""
+    return service_count(snap, selected_month)
 
 
-def peak_hours(df):
-    """Find busiest hours."""
-    query = """
-        SELECT strftime('%H', Timestamp) AS hour, COUNT(*) AS visit_count
-        FROM df
-        GROUP BY hour
-        ORDER BY visit_count DESC
-    """
-    return duckdb.query(query).df()
+def unique_service_source(snap, selected_month=None) -> TableQuery:
+    """unique_service_counts() as a TableQuery over the per-snapshot service counts."""
+    def long_counts():
+        tables = snap.cached("service_count", snap.service_usage.counts_by_month)
+        return pd.concat([t.assign(_month=month) for month, t in tables.items()], ignore_index=True)
 
+    table = _derived_table(snap, "service_counts", None, long_counts)
+    return TableQuery(f"SELECT * FROM {table} WHERE _month = $month", order_by="_row",
+                      params={"month": selected_month or "All months"})
 
-def weekday_visits(df):
-    """Visits per weekday."""
-    query = """
-        SELECT strftime('%A', Timestamp) AS weekday, COUNT(*) AS visits
-        FROM df
-        GROUP BY weekday
-        ORDER BY visits DESC
-    """
-    return duckdb.query(query).df()
 
+# --- Paged tables ---
+# Tables in the app page through a TableQuery with the functions below. The
+# query runs once per snapshot (and day, for queries relative to NOW()) into
+# a DuckDB table; filtering, sorting and LIMIT/OFFSET then run on that, and
+# only the visible page is turned into a frame and sent to the browser.
 
-def service_count(df, selected_month=None):
-    """Service-wise usage count."""
-    if selected_month and selected_month != "All months":
-        df = df[df["Month"] == selected_month]
-    melted = df.melt(
-        id_vars=["Name", "Timestamp"],
-        value_vars=["Waxing", "Facial", "De-tan", "Pedicure", "Manicure",
-                    "Bleaching", "Wash", "Massage", "Threading", "Hair Cut"],
-        var_name="Service",
-        value_name="Used"
-    )
-    melted = melted[melted["Used"].astype(str).str.strip() != ""]
-    query = """
-        SELECT Service, COUNT(*) AS count
-        FROM melted
-        GROUP BY Service
-        ORDER BY count DESC
-    """
-    return duckdb.query(query).df()
+_paged_tables = itertools.count(1)
 
 
-def top_clients(df):
-    """Top 20 clients by visits."""
-    query = """
-        SELECT Name, COUNT(*) AS visits
-        FROM df
-        GROUP BY Name
-        ORDER BY visits DESC
-        LIMIT 20
-    """
-    return duckdb.query(query).df()
+def _materialized_key(table: TableQuery, day=None):
+    return ("materialized", table.sql, tuple(sorted((table.params or {}).items())), day or periods.day().start)
 
 
-def top_spenders(df):
-    """Top 10 customers by spending."""
-    query = """
-        SELECT Name, SUM("Bill Amount") AS total_spent
-        FROM df
-        GROUP BY Name
-        ORDER BY total_spent DESC
-        LIMIT 10
-    """
-    return duckdb.query(query).df()
+def _materialized(snap, table: TableQuery) -> str:
+    """Name of the snapshot table holding the result of `table`."""
+    def build():
+        name = f"paged_{next(_paged_tables)}"
+        snap.materialize(name, table.sql, table.params)
+        return name
+    return snap.cached(_materialized_key(table), build)
 
 
-def spend_vs_visits(df):
-    """Customer spend vs visits."""
-    query = """
-        SELECT Name,
-               COUNT(*) AS visits,
-               SUM("Bill Amount") AS total_spent,
-               ROUND(SUM("Bill Amount") / COUNT(*), 2) AS avg_spend_per_visit
-        FROM df
-        GROUP BY Name
-        ORDER BY total_spent DESC
-    """
-    return duckdb.query(query).df()
+def table_rows(snap, table: TableQuery) -> pd.DataFrame:
+    """Every row of `table`, hidden columns included, as materialized for paging."""
+    return snap.sql(f"SELECT * FROM {_materialized(snap, table)}")
 
 
-def days_since_last_visit(df):
-    """Days since customer's last visit."""
-    latest = df.groupby("Name")["Timestamp"].max().reset_index()
-    latest["Days Since Last Visit"] = (pd.Timestamp.now() - latest["Timestamp"]).dt.days
-    latest = latest.rename(columns={"Timestamp": "Last Visit Date"})
-    return latest.sort_values(by="Days Since Last Visit", ascending=False)
+def seed_table(snap, table: TableQuery, rows: pd.DataFrame, day=None):
+    """Use precomputed `rows` (from table_rows) as the result of `table` on `day`."""
+    name = f"paged_{next(_paged_tables)}"
+    snap.register(name, rows)
+    snap.seed(_materialized_key(table, day), name)
 
 
-def employee_service_ranking(df):
-    """Employee by number of services."""
-    query = """
-        SELECT "Service done by" AS employee, COUNT(*) AS service_count
-        FROM df
-        GROUP BY employee
-        ORDER BY service_count DESC
-    """
-    return duckdb.query(query).df()
+def table_columns(snap, table: TableQuery) -> list:
+    """Displayed columns of a table query (those not starting with "_")."""
+    def describe():
+        names = snap.sql(f"SELECT * FROM {_materialized(snap, table)} LIMIT 0").columns
+        return [name for name in names if not name.startswith("_")]
+    return snap.cached(("columns", table.sql), describe)
 
 
-def employee_revenue_ranking(df):
-    """Employee by total revenue."""
-    query = """
-        SELECT "Service done by" AS employee, SUM("Bill Amount") AS total_revenue
-        FROM df
-        GROUP BY employee
-        ORDER BY total_revenue DESC
-    """
-    return duckdb.query(query).df()
-
+def _filtered(snap, table: TableQuery, search: str):
+    """FROM/WHERE clause and params for the rows of `table` matching `search` in any column."""
+    source = _materialized(snap, table)
+    if not search:
+        return f"FROM {source}", {}
 
-def unique_service_counts(df, selected_month=None):
-    """Unique service types."""
-    return service_count(df, selected_month)
+    pattern = search.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    matches = " OR ".join(
+        f"""CAST("{name}" AS VARCHAR) ILIKE $search ESCAPE '\\'""" for name in table_columns(snap, table)
+    )
+    return f"FROM {source} WHERE {matches}", {"search": f"%{pattern}%"}
+
+
+@traced("query")
+def table_count(snap, table: TableQuery, search: str = "") -> int:
+    """Number of rows of `table` matching `search`."""
+    source, params = _filtered(snap, table, search)
+    return snap.fetchone(f"SELECT COUNT(*) {source}", params or None)[0]
+
+
+@traced("query")
+def table_page(snap, table: TableQuery, search: str = "", sort: str = None, descending: bool = False,
+               limit: int = 50, offset: int = 0):
+    """One page of `table` matching `search`, sorted by column `sort` (default order if None)."""
+    columns = table_columns(snap, table)
+    source, params = _filtered(snap, table, search)
+    order_by = table.order_by
+    if sort in columns:
+        direction = "DESC" if descending else "ASC"
+        order_by = f'"{sort}" {direction} NULLS LAST, {table.order_by}'
+    select = ", ".join(f'"{name}"' for name in columns)
+    query = f"SELECT {select} {source} ORDER BY {order_by} LIMIT $limit OFFSET $offset"
+    return snap.sql(query, {**params, "limit": int(limit), "offset": int(offset)})
 
 #------------------------------------------Tab-3----------------------------------------------------------------
-def get_employee_sales(df: pd.DataFrame):
+@traced("query")
+@per_snapshot
+def get_employee_sales(snap):
     """Employee ranking by number of products sold"""
     query = """
         SELECT "Sold by" AS employee, COUNT(*) AS total_products_sold
-        FROM df
+        FROM products
         GROUP BY employee
         ORDER BY total_products_sold DESC
     """
-    return duckdb.query(query).to_df()
+    return snap.sql(query)
 
 
-def get_employee_revenue(df: pd.DataFrame):
+@traced("query")
+@per_snapshot
+def get_employee_revenue(snap):
     """Employee ranking by total bill amount"""
     query = """
         SELECT "Sold by" AS employee, SUM("Bill Amount") AS total_revenue
-        FROM df
+        FROM products
         GROUP BY employee
         ORDER BY total_revenue DESC
     """
-    return duckdb.query(query).to_df()
+    return snap.sql(query)
 
 
-def get_revenue_summary(df: pd.DataFrame):
+@traced("query")
+@per_snapshot
+def get_revenue_summary(snap):
     """Today's, weekly, and monthly revenue + count"""
     query = """
         SELECT
             SUM("Bill Amount") AS total_revenue,
             COUNT(*) AS total_sales
-        FROM df
+        FROM products
     """
-    return duckdb.query(query).to_df().iloc[0]
+    return snap.sql(query).iloc[0]
 
 
-def get_top_products(df: pd.DataFrame):
+@traced("query")
+@per_snapshot
+def get_top_products(snap):
     """Product frequency count"""
     query = """
         SELECT "Product Name" AS product, COUNT(*) AS sold_count
-        FROM df
+        FROM products
         GROUP BY product
         ORDER BY sold_count DESC
     """
-    return duckdb.query(query).to_df()
+    return snap.sql(query)
 
 
-def get_sales_by_day(df: pd.DataFrame):
+@traced("query")
+@per_snapshot
+def get_sales_by_day(snap):
     """Total sales and orders grouped by weekday"""
     query = """
-        SELECT 
-            strftime('%A', strptime("Date", '%d-%b-%Y')) AS day_of_week,
+        SELECT
+            strftime("Date", '%A') AS day_of_week,
             SUM("Bill Amount") AS total_sold,
             COUNT(*) AS total_orders
-        FROM df
+        FROM products
         GROUP BY day_of_week
-        ORDER BY min(strptime("Date", '%d-%b-%Y'))
+        ORDER BY MIN("Date")
     """
-    return duckdb.query(query).to_df()
+    return snap.sql(query)
 
 
-def get_incentive_by_employee(df: pd.DataFrame):
+@traced("query")
+@per_snapshot
+def get_incentive_by_employee(snap):
     """Calculate yearly incentive (1% of total bill amount) per employee."""
-
-    # Get current year
-    current_year = datetime.now().year
-
-    # Convert date column to proper datetime format
-    df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-
-    # Filter only current year's records
-    df_year = df[df["Date"].dt.year == current_year]
-
-    query = """
-        SELECT 
+    query = f"""
+        SELECT
             "Sold by" AS employee,
             SUM("Bill Amount") * 0.01 AS incentive_amount
-        FROM df_year
+        FROM products
+        WHERE {_within("year", '"Date"')}
         GROUP BY employee
         ORDER BY incentive_amount DESC
     """
-
-    return duckdb.query(query).to_df()
-
-# =========================
-# 📦 PRODUCT SALES QUERIES
-# =========================
-
-def total_product_sales(df):
-    """Total revenue from all product sales."""
-    query = """
-        SELECT SUM("Bill Amount") AS total_product_revenue
-        FROM df
-    """
-    return duckdb.query(query).df()
-
-
-def total_products_sold(df):
-    """Total number of products sold."""
-    query = """
-        SELECT COUNT(*) AS total_products_sold
-        FROM df
-    """
-    return duckdb.query(query).df()
-
-
-def products_sold_today(df):
-    """Products sold today."""
-    query = """
-        SELECT COUNT(*) AS products_sold_today
-        FROM df
-        WHERE DATE(Timestamp) = DATE(CURRENT_DATE)
-    """
-    return duckdb.query(query).df()
-
-
-def products_sold_last_week(df):
-    """Products sold in the last 7 days."""
-    query = """
-        SELECT COUNT(*) AS products_sold_last_week
-        FROM df
-        WHERE DATE(Timestamp) >= DATE(CURRENT_DATE) - INTERVAL 7 DAY
-    """
-    return duckdb.query(query).df()
-
-
-def products_sold_last_month(df):
-    """Products sold in the last 30 days."""
-    query = """
-        SELECT COUNT(*) AS products_sold_last_month
-        FROM df
-        WHERE DATE(Timestamp) >= DATE(CURRENT_DATE) - INTERVAL 30 DAY
-    """
-    return duckdb.query(query).df()
\ No newline at end of file
+    return snap.sql(query, periods.as_params(year=periods.year()))
@@ -0,0 +1,57 @@
+import os
+
+import streamlit as st
+
+import query
+from utils.instrumentation import traced
+
+# 📄 Rows sent to the browser per table page
+PAGE_SIZE = int(os.environ.get("BLSH_TABLE_PAGE_SIZE", "50"))
+
+
+def _first_page(key):
+    st.session_state[f"{key}_page"] = 1
+
+
+@st.fragment
+@traced("fragment")
+def paged_table(snap, table: query.TableQuery, key: str, height: int = 400, page_size: int = PAGE_SIZE):
+    """
+    Searchable, sortable table that only ever fetches and sends one page.
+
+    Search, sort and paging run in DuckDB on the snapshot (query.table_count
+    / query.table_page), so the cost of a rerun depends on the page size,
+    not on how many rows the table has. Changing the page reruns only this
+    table.
+    """
+    columns = query.table_columns(snap, table)
+
+    search_col, sort_col, order_col = st.columns([3, 2, 1])
+    search = search_col.text_input("Search", key=f"{key}_search", placeholder="🔍 Search",
+                                   label_visibility="collapsed", on_change=_first_page, args=(key,))
+    sort = sort_col.selectbox("Sort by", [None, *columns], key=f"{key}_sort", label_visibility="collapsed",
+                              format_func=lambda col: "Default order" if col is None else f"Sort by {col}",
+                              on_change=_first_page, args=(key,))
+    descending = order_col.toggle("Descending", key=f"{key}_desc", disabled=sort is None,
+                                  on_change=_first_page, args=(key,))
+
+    total = query.table_count(snap, table, search)
+    pages = max(1, -(-total // page_size))
+    page_key = f"{key}_page"
+    if st.session_state.get(page_key, 1) > pages:
+        st.session_state[page_key] = pages  # fewer matches than before (new search, month or data)
+
+    table_area = st.container()
+    page_col, info_col = st.columns([1, 3])
+    page = page_col.number_input("Page", min_value=1, max_value=pages, step=1, key=page_key,
+                                 label_visibility="collapsed")
+    offset = (page - 1) * page_size
+
+    rows = query.table_page(snap, table, search, sort, descending, page_size, offset)
+    rows.index = range(offset + 1, offset + 1 + len(rows))  # rank across pages, from 1
+    table_area.dataframe(rows, use_container_width=True, height=height)
+
+    if total:
+        info_col.caption(f"Page {page} of {pages} · rows {offset + 1:,}–{offset + len(rows):,} of {total:,}")
+    else:
+        info_col.caption("No matching rows")
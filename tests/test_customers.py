@@ -0,0 +1,52 @@
+"""Customer identity: one ID per customer, whether or not a bill carries the phone."""
+import pandas as pd
+
+from utils.snapshot import build_snapshot
+
+PRODUCTS = pd.DataFrame()
+
+
+def _bills(rows):
+    bills = pd.DataFrame(rows, columns=["Timestamp", "Name", "Phone Number", "Bill Amount"])
+    return bills.assign(**{"Service done by": "Chitra"})
+
+
+def _ids(snap, name):
+    return snap.clients.loc[snap.clients["Name"] == name, "Customer ID"]
+
+
+def test_bills_without_a_phone_join_the_customer_with_that_name():
+    bills = _bills([
+        ["01/03/2025 10:00:00", "Asha Rao", "", "500"],
+        ["02/03/2025 10:00:00", "Asha Rao", "+91 98765 43210", "700"],
+        ["03/03/2025 10:00:00", "asha  rao", "", "300"],
+        ["04/03/2025 10:00:00", "Bina", "", "200"],
+    ])
+    snap = build_snapshot(bills, PRODUCTS)
+
+    assert _ids(snap, "Asha Rao").nunique() == 1
+    assert len(snap.customers.table) == 2  # Asha by phone, Bina by name
+    asha = snap.customers.table.set_index("customer_id").loc[_ids(snap, "Asha Rao").iloc[0]]
+    assert asha["phone"] == "9876543210"
+    assert asha["first_visit"] == pd.Timestamp("2025-03-01 10:00")
+
+
+def test_appended_bills_without_a_phone_join_the_existing_customer():
+    bills = _bills([
+        ["01/03/2025 10:00:00", "Asha Rao", "9876543210", "700"],
+        ["02/03/2025 10:00:00", "Asha Rao", "", "300"],
+    ])
+    before = build_snapshot(bills.iloc[:1].copy(), PRODUCTS)
+    after = build_snapshot(bills.copy(), PRODUCTS, previous=before)
+    assert _ids(after, "Asha Rao").nunique() == 1
+    assert len(after.customers.table) == 1
+
+
+def test_bills_without_a_phone_stay_apart_when_the_name_is_ambiguous():
+    bills = _bills([
+        ["01/03/2025 10:00:00", "Asha", "9876543210", "700"],
+        ["02/03/2025 10:00:00", "Asha", "9123456789", "300"],
+        ["03/03/2025 10:00:00", "Asha", "", "100"],
+    ])
+    snap = build_snapshot(bills, PRODUCTS)
+    assert _ids(snap, "Asha").nunique() == 3
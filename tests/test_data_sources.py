@@ -0,0 +1,47 @@
+"""Every local backend loads the same extract into the same typed frame."""
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import query
+from benchmarks import synthetic
+from utils import data_sources
+
+SHEET = "Client Data"
+
+
+@pytest.fixture(scope="module")
+def extract(tmp_path_factory):
+    """The same bills as CSV text, and as Parquet/SQLite with a numeric phone column that has gaps."""
+    path = tmp_path_factory.mktemp("extract")
+    bills = synthetic.client_data(300)
+    phones = pd.Series(9_876_543_210 + np.arange(len(bills)), dtype="float64")
+    phones[::7] = np.nan
+    bills["Phone Number"] = phones
+
+    stem = data_sources.file_stem(SHEET)
+    as_text = bills.assign(**{"Phone Number": phones.map(lambda v: "" if pd.isna(v) else str(int(v)))})
+    as_text.to_csv(path / f"{stem}.csv", index=False)
+    bills.to_parquet(path / f"{stem}.parquet", index=False)
+    with sqlite3.connect(path / "bills.db") as con:
+        bills.to_sql(stem, con, index=False, dtype={"Phone Number": "INTEGER"})
+    return path
+
+
+def _load(kind, extract):
+    path = extract / "bills.db" if kind == "sqlite" else extract
+    return data_sources.make_source(kind, str(path)).load(SHEET)
+
+
+@pytest.mark.parametrize("kind", ["parquet", "sqlite"])
+def test_backends_load_the_same_typed_frame(kind, extract):
+    expected = _load("csv", extract)
+    loaded = _load(kind, extract)
+
+    # CSV keeps missing phones as empty text, the numeric backends as NA
+    phone = "Phone Number"
+    pd.testing.assert_series_equal(loaded[phone].fillna(""), expected[phone])
+    pd.testing.assert_series_equal(query.normalize_phone(loaded[phone]), query.normalize_phone(expected[phone]))
+    pd.testing.assert_frame_equal(loaded.drop(columns=phone), expected.drop(columns=phone))
@@ -0,0 +1,62 @@
+"""Derived tables folded forward from the previous snapshot must match a rebuild from scratch."""
+import pandas as pd
+import pytest
+
+from benchmarks import synthetic
+from utils.snapshot import build_snapshot
+
+PRODUCTS = synthetic.product_sale(50)
+
+
+@pytest.fixture(scope="module")
+def bills():
+    return synthetic.client_data(2000)
+
+
+def _build(clients, previous=None):
+    return build_snapshot(clients.copy(), PRODUCTS.copy(), previous=previous)
+
+
+def _rollup(snap):
+    return snap.rollup.table.sort_values(["day", "employee", "hour"], ignore_index=True)
+
+
+def test_rollup_folds_in_appended_bills(bills):
+    folded = _build(bills, previous=_build(bills.iloc[:1500]))
+    pd.testing.assert_frame_equal(_rollup(folded), _rollup(_build(bills)))
+
+
+def test_rollup_rebuilds_when_an_old_bill_is_edited(bills):
+    before = _build(bills)
+    edited = bills.copy()
+    edited.loc[5, "Bill Amount"] += 1_000_000
+
+    after = _build(edited, previous=before)
+    assert after.rollup.table["amount"].sum() == after.clients["Bill Amount"].sum()
+    pd.testing.assert_frame_equal(_rollup(after), _rollup(_build(edited)))
+
+
+def test_customers_rebuild_when_an_old_phone_number_is_edited(bills):
+    before = _build(bills)
+    edited = bills.copy()
+    edited.loc[7, "Phone Number"] = "9999999999"
+
+    after = _build(edited, previous=before)
+    fresh = _build(edited)
+    assert "9999999999" in set(after.customers.table["phone"].dropna())
+    pd.testing.assert_frame_equal(after.customers.table, fresh.customers.table)
+    pd.testing.assert_series_equal(after.clients["Customer ID"], fresh.clients["Customer ID"])
+
+
+def test_customer_months_rebuild_when_an_old_bill_is_edited(bills):
+    before = _build(bills)
+    edited = bills.copy()
+    edited.loc[5, "Bill Amount"] += 1_000_000
+
+    after = _build(edited, previous=before)
+    months = after.customer_months.table
+    assert months["total_spent"].sum() == after.clients.loc[after.clients["Customer ID"].notna(), "Bill Amount"].sum()
+    pd.testing.assert_frame_equal(
+        months.sort_values(["month", "customer_id"], ignore_index=True),
+        _build(edited).customer_months.table.sort_values(["month", "customer_id"], ignore_index=True),
+    )
@@ -0,0 +1,23 @@
+"""The mirror file only changes (and gets a new version) when the synced frame does."""
+import pytest
+
+from benchmarks import synthetic
+from utils import mirror_store, schema
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(mirror_store, "STORE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_unchanged_sync_keeps_the_mirror_version(store):
+    bills = schema.typed("Client Data", synthetic.client_data(500))
+    assert mirror_store._write_mirror("Client Data", bills)
+    version = mirror_store.mirror_version("Client Data")
+
+    assert not mirror_store._write_mirror("Client Data", bills.copy())
+    assert mirror_store.mirror_version("Client Data") == version
+
+    assert mirror_store._write_mirror("Client Data", bills.iloc[:-1])
+    assert len(mirror_store.read_worksheet("Client Data")) == len(bills) - 1
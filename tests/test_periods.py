@@ -0,0 +1,32 @@
+"""Calendar periods around month and year boundaries."""
+from datetime import datetime
+
+import pytest
+
+from utils import periods
+from utils.periods import Period
+
+D = datetime
+
+
+@pytest.mark.parametrize("now, week, month, last_days, trailing_month", [
+    # Thursday 2 January: last week and last month are in the previous year
+    (D(2025, 1, 2, 14, 30), Period(D(2024, 12, 23), D(2024, 12, 30)), Period(D(2024, 12, 1), D(2025, 1, 1)),
+     Period(D(2024, 12, 26), D(2025, 1, 3)), Period(D(2024, 12, 2, 14, 30), D(2025, 1, 3))),
+    # Monday 31 March: the week starts today, one month back clamps to 28 February
+    (D(2025, 3, 31, 9), Period(D(2025, 3, 24), D(2025, 3, 31)), Period(D(2025, 2, 1), D(2025, 3, 1)),
+     Period(D(2025, 3, 24), D(2025, 4, 1)), Period(D(2025, 2, 28, 9), D(2025, 4, 1))),
+    # Wednesday 31 December: today's period ends in the next year
+    (D(2025, 12, 31, 20), Period(D(2025, 12, 22), D(2025, 12, 29)), Period(D(2025, 11, 1), D(2025, 12, 1)),
+     Period(D(2025, 12, 24), D(2026, 1, 1)), Period(D(2025, 11, 30, 20), D(2026, 1, 1))),
+])
+def test_periods_across_boundaries(now, week, month, last_days, trailing_month):
+    assert periods.week(-1, now=now) == week
+    assert periods.month(-1, now=now) == month
+    assert periods.last_days(7, now=now) == last_days
+    assert periods.trailing_months(1, now=now) == trailing_month
+
+
+def test_week_spanning_new_year():
+    assert periods.week(now=D(2025, 12, 31)) == Period(D(2025, 12, 29), D(2026, 1, 5))
+    assert periods.week(now=D(2026, 1, 2)) == Period(D(2025, 12, 29), D(2026, 1, 5))
@@ -0,0 +1,27 @@
+"""Precomputed snapshots can be written and loaded when one sheet is empty."""
+import pandas as pd
+import pytest
+
+import query
+from benchmarks import synthetic
+from utils import precompute, schema
+from utils.snapshot import build_snapshot
+
+CLIENTS = schema.typed("Client Data", synthetic.client_data(500))
+PRODUCTS = schema.typed("Product Sale", synthetic.product_sale(100))
+
+
+@pytest.mark.parametrize("clients, products", [(CLIENTS, pd.DataFrame()), (pd.DataFrame(), PRODUCTS)],
+                         ids=["no product sales", "no client data"])
+def test_snapshot_with_one_empty_sheet(tmp_path, clients, products):
+    snap = build_snapshot(clients.copy(), products.copy())
+    path = precompute.write_snapshot(snap, clients, products, str(tmp_path))
+    assert path.endswith("000001")
+
+    loaded = precompute.load_snapshot(1, str(tmp_path))
+    for name, args in precompute.dashboard_calls(snap):
+        expected = getattr(query, name)(snap, *args)
+        if isinstance(expected, pd.DataFrame):
+            pd.testing.assert_frame_equal(getattr(query, name)(loaded, *args), expected)
+    assert loaded.clients.empty == clients.empty
+    assert loaded.products.empty == products.empty
@@ -0,0 +1,22 @@
+"""Phone normalization behind the customer identity keys."""
+import pandas as pd
+import pytest
+
+import query
+
+
+@pytest.mark.parametrize("raw, key", [
+    ("9876543210", 9876543210),
+    ("+91 98765 43210", 9876543210),
+    ("09876543210", 9876543210),
+    ("98765-43210", 9876543210),
+    ("", pd.NA),
+    (None, pd.NA),
+    # Two numbers in one cell or an overlong digit run: no key, never an overflowed one
+    ("9876543210/9123456789", pd.NA),
+    ("12345678901234567890", pd.NA),
+])
+def test_normalize_phone(raw, key):
+    normalized = query.normalize_phone(pd.Series([raw], dtype=object))
+    assert normalized.dtype == "Int64"
+    assert normalized.iloc[0] is pd.NA if key is pd.NA else normalized.iloc[0] == key
@@ -0,0 +1,114 @@
+"""Delta sync of append-only worksheets against a stub worksheet."""
+import re
+
+import pandas as pd
+import pytest
+
+from utils import mirror_store, schema, sheets_connector
+
+SHEET = "Client Data"
+HEADER = ["Timestamp", "Name", "Bill Amount", "Waxing"]
+
+
+def _row(i):
+    # Every third bill has no service: the values API trims that trailing blank cell
+    return [f"{i % 28 + 1:02d}/01/2025 10:00:00", f"Customer {i}", str(100 + i), "Yes" if i % 3 else ""]
+
+
+def _column(letters):
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - 64
+    return number
+
+
+class StubSheet:
+    """Serves get_all_values / batch_get from a list of rows, like gspread's Worksheet."""
+
+    def __init__(self, rows):
+        self.values = [HEADER] + rows
+        self.calls = []
+
+    @staticmethod
+    def _trimmed(row):
+        while row and row[-1] == "":
+            row = row[:-1]
+        return list(row)
+
+    def get_all_values(self):
+        self.calls.append("full")
+        return [list(row) for row in self.values]
+
+    def batch_get(self, ranges):
+        self.calls.append("delta")
+        header_range, rows_range = ranges
+        assert header_range == "1:1"
+        first, last = re.fullmatch(r"A(\d+):([A-Z]+)", rows_range).groups()
+        rows = [self._trimmed(row[:_column(last)]) for row in self.values[int(first) - 1:]]
+        return [[self.values[0]], rows]
+
+
+@pytest.fixture(autouse=True)
+def state(tmp_path, monkeypatch):
+    monkeypatch.setattr(mirror_store, "STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(sheets_connector, "_sync_state", {})
+
+
+def _sync(sheet):
+    sheet.calls.clear()
+    return sheets_connector._delta_sync(SHEET, sheet)
+
+
+def _expected(sheet):
+    return schema.typed_frame(SHEET, HEADER, sheets_connector._pad_rows(sheet.values[1:], len(HEADER)))
+
+
+def test_appended_rows_are_fetched_as_a_delta():
+    sheet = StubSheet([_row(i) for i in range(120)])
+    assert len(_sync(sheet)) == 120 and sheet.calls == ["full"]
+
+    sheet.values += [_row(i) for i in range(120, 125)]
+    df = _sync(sheet)
+    assert sheet.calls == ["delta"]
+    pd.testing.assert_frame_equal(df, _expected(sheet))
+
+    # Nothing new: the same frame, still without a full download
+    assert _sync(sheet) is df and sheet.calls == ["delta"]
+
+
+@pytest.mark.parametrize("change", ["edit inside the window", "delete further back"])
+def test_changed_rows_fall_back_to_a_full_reload(change):
+    sheet = StubSheet([_row(i) for i in range(120)])
+    _sync(sheet)
+
+    if change == "edit inside the window":
+        sheet.values[110][2] = "999"
+    else:
+        del sheet.values[3]
+    sheet.values.append(_row(120))
+
+    df = _sync(sheet)
+    assert sheet.calls == ["delta", "full"]
+    pd.testing.assert_frame_equal(df, _expected(sheet))
+
+
+def test_a_new_process_resumes_from_the_saved_state():
+    sheet = StubSheet([_row(i) for i in range(120)])
+    mirror_store._write_mirror(SHEET, _sync(sheet))
+
+    sheets_connector._sync_state.clear()  # as in a fresh process
+    sheet.values += [_row(i) for i in range(120, 130)]
+    df = _sync(sheet)
+    assert sheet.calls == ["delta"]
+    pd.testing.assert_frame_equal(df, _expected(sheet))
+
+
+def test_saved_state_is_ignored_when_the_mirror_changed():
+    sheet = StubSheet([_row(i) for i in range(120)])
+    _sync(sheet)
+    mirror_store._write_mirror(SHEET, _expected(StubSheet([_row(i) for i in range(60)])))
+
+    sheets_connector._sync_state.clear()
+    df = _sync(sheet)
+    assert sheet.calls == ["full"]
+    assert len(df) == 120
@@ -0,0 +1,21 @@
+"""The Home tab's startup imports stay lazy and within the import-time budget."""
+import os
+
+import pytest
+
+from benchmarks import import_time
+
+
+def test_startup_does_not_import_lazy_modules():
+    _, eager, _ = import_time.measure()
+    assert eager == [], f"imported at startup but should be lazy: {', '.join(eager)}"
+
+
+# Wall-clock timings vary by 100-200 ms between runs; only check a budget set for this machine
+@pytest.mark.skipif("BLSH_IMPORT_BUDGET_MS" not in os.environ,
+                    reason="set BLSH_IMPORT_BUDGET_MS to check the import-time budget on this machine")
+def test_startup_imports_within_budget():
+    ms = min(import_time.measure()[0] for _ in range(3))
+    assert ms <= import_time.BUDGET_MS, (
+        f"startup imports take {ms:,.0f} ms, over the {import_time.BUDGET_MS:,.0f} ms budget"
+    )
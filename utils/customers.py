@@ -0,0 +1,138 @@
+"""
+Customer identity for the service bills.
+
+Every bill is assigned a compact integer customer ID: bills with the same
+normalized phone number ("Phone Key") belong to one customer. A bill
+without a usable phone joins the phone customer billed under the same
+normalized name when there is exactly one, and otherwise falls back to a
+customer keyed by the normalized name. Each customer
+keeps a canonical display name (the latest name billed under that ID) and
+the time of its first visit, so client-level queries group on one integer
+column and join the `customers` table for display instead of grouping on
+raw phone or name strings, and "is this a new client?" is a lookup.
+
+IDs are stable across snapshots: newly appended bills reuse existing IDs
+and only unseen customers get new ones.
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from utils import incremental
+
+NO_CUSTOMER = -1
+
+
+def _normalized_names(names: pd.Series) -> pd.Series:
+    """Lower-cased names with whitespace collapsed; empty names become NA."""
+    names = names.astype("string").str.split().str.join(" ")
+    return names.str.lower().replace("", pd.NA)
+
+
+def name_phones(bills: pd.DataFrame) -> pd.DataFrame:
+    """Distinct (normalized name, phone key) pairs billed together."""
+    pairs = pd.DataFrame({
+        "name": _normalized_names(bills["Name"]),
+        "key": "p" + bills["Phone Key"].astype("string"),
+    })
+    return pairs.dropna().drop_duplicates(ignore_index=True)
+
+
+def customer_keys(bills: pd.DataFrame, pairs: pd.DataFrame = None) -> pd.Series:
+    """
+    Identity key per bill: "p<phone key>", else the key of the only phone
+    customer billed under the bill's name in `pairs` (see name_phones()),
+    else "n<normalized name>", else NA.
+    """
+    names = _normalized_names(bills["Name"])
+    pairs = name_phones(bills) if pairs is None else pairs
+    unique = pairs.drop_duplicates("name", keep=False)
+    by_known_name = names.map(pd.Series(unique["key"].to_numpy(), index=unique["name"].to_numpy()))
+
+    by_phone = "p" + bills["Phone Key"].astype("string")
+    return by_phone.fillna(by_known_name.astype("string")).fillna("n" + names)
+
+
+def _display_names(bills: pd.DataFrame) -> pd.Series:
+    names = bills["Name"].astype("string").str.strip()
+    return names.replace("", pd.NA)
+
+
+_EMPTY_PAIRS = pd.DataFrame({
+    "name": pd.Series(dtype="string"),
+    "key": pd.Series(dtype="string"),
+})
+
+_EMPTY_TABLE = pd.DataFrame({
+    "customer_id": pd.Series(dtype="int32"),
+    "phone": pd.Series(dtype="string"),
+    "name": pd.Series(dtype="string"),
+    "first_visit": pd.Series(dtype="datetime64[ns]"),
+})
+
+
+@dataclass(frozen=True)
+class CustomerIndex:
+    """Customer ID of every bill ingested so far, plus one row per customer."""
+    keys: pd.Index = field(default_factory=lambda: pd.Index([], dtype=object))
+    table: pd.DataFrame = field(default_factory=_EMPTY_TABLE.copy)
+    ids: np.ndarray = field(default_factory=lambda: np.empty(0, dtype="int32"))
+    pairs: pd.DataFrame = field(default_factory=_EMPTY_PAIRS.copy)  # name_phones() of every ingested bill
+    rows: int = 0
+    fingerprint: str = None
+
+    def bill_ids(self) -> pd.Series:
+        """Customer ID per ingested bill (sheet order), NA for anonymous bills."""
+        ids = pd.array(self.ids, dtype="Int32")
+        ids[self.ids == NO_CUSTOMER] = pd.NA
+        return pd.Series(ids, name="Customer ID")
+
+    def updated(self, bills: pd.DataFrame) -> "CustomerIndex":
+        """Index for `bills`, assigning IDs only to the rows appended since this one."""
+        if bills.empty:
+            return CustomerIndex()
+
+        start, fingerprint = incremental.appended_rows(bills, self.rows, self.fingerprint)
+        if start == len(bills):
+            return self
+        base = self if start else CustomerIndex()
+
+        new = bills.iloc[base.rows:]
+        pairs = pd.concat([base.pairs, name_phones(new)], ignore_index=True).drop_duplicates(ignore_index=True)
+        keys = customer_keys(new, pairs)
+
+        # Unseen keys get the next IDs, in order of first appearance
+        unseen = pd.Index(keys.dropna().unique()).difference(base.keys, sort=False)
+        all_keys = base.keys.append(unseen)
+        ids = np.where(keys.isna(), NO_CUSTOMER, all_keys.get_indexer(keys.fillna(""))).astype("int32")
+
+        table = pd.concat([base.table, pd.DataFrame({
+            "customer_id": np.arange(len(base.keys), len(all_keys), dtype="int32"),
+            "phone": pd.Series(unseen, dtype="string").str.extract(r"^p(\d+)$", expand=False),
+            "name": pd.Series(pd.NA, index=range(len(unseen)), dtype="string"),
+            "first_visit": pd.Series(pd.NaT, index=range(len(unseen)), dtype="datetime64[ns]"),
+        })], ignore_index=True)
+
+        known = ids != NO_CUSTOMER
+
+        # Canonical name: the latest non-empty name billed under each ID
+        latest = _display_names(new)[known].groupby(ids[known]).last().dropna()
+        table.loc[latest.index, "name"] = latest.to_numpy()
+
+        # First visit: earliest bill so far (appended rows need not be in time order)
+        first = pd.Series(new["Timestamp"].to_numpy()[known]).groupby(ids[known]).min().dropna()
+        earlier = pd.DataFrame({
+            "old": table.loc[first.index, "first_visit"].to_numpy(),
+            "new": first.to_numpy(),
+        }).min(axis=1)
+        table.loc[first.index, "first_visit"] = earlier.to_numpy()
+
+        return CustomerIndex(
+            all_keys,
+            table,
+            np.concatenate([base.ids, ids]),
+            pairs,
+            len(bills),
+            fingerprint,
+        )
@@ -0,0 +1,145 @@
+"""
+Interchangeable sources for the bills worksheets.
+
+Every backend returns the same typed frames for a worksheet name
+("Client Data", "Product Sale"), with the column types declared in
+utils/schema.py: datetime Timestamp, float Bill Amount, boolean service
+flags and text for everything else. The mirror store syncs from whichever
+source is configured, so the dashboard can run on a local extract for load
+tests, offline demos and reproducible benchmarks:
+
+    BLSH_DATA_SOURCE=sheets                                  # Google Sheets (default)
+    BLSH_DATA_SOURCE=csv     BLSH_DATA_PATH=extract/          # extract/client_data.csv, ...
+    BLSH_DATA_SOURCE=parquet BLSH_DATA_PATH=extract/          # extract/client_data.parquet, ...
+    BLSH_DATA_SOURCE=sqlite  BLSH_DATA_PATH=extract/bills.db  # tables client_data, product_sale
+
+Only the Google Sheets backend imports the sheets connector, which needs
+credentials; the local backends run without network access.
+"""
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+from contextlib import closing
+
+import pandas as pd
+
+from utils import schema
+
+DATA_SOURCE = os.environ.get("BLSH_DATA_SOURCE", "sheets")
+DATA_PATH = os.environ.get("BLSH_DATA_PATH", "")
+
+
+def file_stem(sheet_name: str) -> str:
+    """File/table name used for a worksheet by the local backends: "Client Data" -> "client_data"."""
+    return sheet_name.lower().replace(" ", "_")
+
+
+class DataSource(ABC):
+    """A place the worksheets can be loaded from."""
+
+    name = "base"
+
+    @abstractmethod
+    def read(self, sheet_name: str) -> pd.DataFrame:
+        """The worksheet as stored by the backend (any column types)."""
+
+    def load(self, sheet_name: str) -> pd.DataFrame:
+        """The worksheet as a typed frame; empty if it is missing or unreachable."""
+        try:
+            df = self.read(sheet_name)
+        except Exception as e:
+            print(f"❌ Error loading '{sheet_name}' from {self.name} source: {e}")
+            return pd.DataFrame()
+        return schema.typed(sheet_name, df) if not df.empty else df
+
+    def load_many(self, sheet_names) -> dict:
+        """Typed frames for several worksheets: {name: DataFrame}."""
+        return {name: self.load(name) for name in dict.fromkeys(sheet_names)}
+
+
+class GoogleSheetsSource(DataSource):
+    """The live spreadsheet, through the delta-syncing sheets connector."""
+
+    name = "Google Sheets"
+
+    def read(self, sheet_name: str) -> pd.DataFrame:
+        from utils import sheets_connector
+
+        # The connector already ingests raw values with the declared schema
+        return sheets_connector.fetch_sheet_data(sheet_name)
+
+    def load(self, sheet_name: str) -> pd.DataFrame:
+        # Re-typing would also replace the parse errors recorded during ingest
+        return self.read(sheet_name)
+
+    def load_many(self, sheet_names) -> dict:
+        from utils import sheets_connector
+
+        # Worksheets download concurrently
+        return sheets_connector.fetch_sheets_data(sheet_names)
+
+
+class CsvSource(DataSource):
+    """One CSV file per worksheet in a directory, as exported from Sheets."""
+
+    name = "CSV"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def read(self, sheet_name: str) -> pd.DataFrame:
+        path = os.path.join(self.directory, f"{file_stem(sheet_name)}.csv")
+        # Read as text so phone numbers keep their formatting
+        return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+class ParquetSource(DataSource):
+    """One Parquet file per worksheet in a directory."""
+
+    name = "Parquet"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def read(self, sheet_name: str) -> pd.DataFrame:
+        return pd.read_parquet(os.path.join(self.directory, f"{file_stem(sheet_name)}.parquet"))
+
+
+class SqliteSource(DataSource):
+    """One table per worksheet in a SQLite database."""
+
+    name = "SQLite"
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def read(self, sheet_name: str) -> pd.DataFrame:
+        with closing(sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)) as con:
+            return pd.read_sql_query(f'SELECT * FROM "{file_stem(sheet_name)}"', con)
+
+
+def make_source(kind: str = None, path: str = None) -> DataSource:
+    """Build the backend named by `kind` (default BLSH_DATA_SOURCE)."""
+    kind = (kind or DATA_SOURCE).lower()
+    path = path if path is not None else DATA_PATH
+
+    if kind in ("sheets", "google", "gsheets"):
+        return GoogleSheetsSource()
+    if kind == "csv":
+        return CsvSource(path or ".")
+    if kind == "parquet":
+        return ParquetSource(path or ".")
+    if kind == "sqlite":
+        return SqliteSource(path or "bills.db")
+    raise ValueError(f"Unknown data source '{kind}' (expected sheets, csv, parquet or sqlite)")
+
+
+_source = None
+
+
+def get_source() -> DataSource:
+    """The configured data source, created on first use."""
+    global _source
+    if _source is None:
+        _source = make_source()
+    return _source
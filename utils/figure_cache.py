@@ -0,0 +1,122 @@
+"""
+Memoized Plotly figures, keyed by a content hash of the input frames.
+
+Building a figure with plotly.express (and validating it) costs tens of
+milliseconds per chart, on every rerun, although most reruns chart exactly
+the same frames as the one before. Figure builders in plots.py are wrapped
+with @cached_figure: their frame arguments are hashed together with the
+other parameters, and the built figure is kept as serialized JSON in a
+process-wide LRU bounded by total bytes (BLSH_FIGURE_CACHE_MB). A hit only
+turns that JSON back into a Figure, skipping the validation it already
+passed when it was built.
+
+Every call returns a fresh Figure, so callers may still tweak the one they
+get without touching the cached copy.
+"""
+import functools
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from utils import instrumentation
+
+# 🧮 Total size of the serialized figures kept in memory
+MAX_BYTES = int(float(os.environ.get("BLSH_FIGURE_CACHE_MB", "64")) * 2**20)
+
+
+def frame_hash(df: pd.DataFrame) -> str:
+    """Content hash of a frame: values, index, column names and dtypes."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(list(zip(df.columns, map(str, df.dtypes)))).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _key_part(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return frame_hash(value.to_frame() if isinstance(value, pd.Series) else value)
+    return repr(value)
+
+
+class FigureCache:
+    """LRU of serialized figures, evicting the least recently used past `max_bytes`."""
+
+    def __init__(self, max_bytes: int = MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> JSON bytes
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """The cached figure for `key` as a new Figure, or None."""
+        with self._lock:
+            spec = self._entries.get(key)
+            if spec is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # Validated when it was first built; rebuilding without validation is ~5x cheaper
+        return go.Figure(json.loads(spec), _validate=False)
+
+    def put(self, key, fig: go.Figure):
+        spec = pio.to_json(fig, validate=False).encode()
+        if len(spec) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old)
+            self._entries[key] = spec
+            self.bytes += len(spec)
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "figures": len(self._entries),
+                "mb": round(self.bytes / 2**20, 2),
+                "max_mb": round(self.max_bytes / 2**20, 2),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+cache = FigureCache()
+
+
+def cached_figure(build):
+    """Serve the figure builder's result from `cache` when its inputs are unchanged."""
+    @functools.wraps(build)
+    def wrapper(*args, **kwargs):
+        key = (
+            build.__qualname__,
+            tuple(_key_part(a) for a in args),
+            tuple(sorted((k, _key_part(v)) for k, v in kwargs.items())),
+        )
+        fig = cache.get(key)
+        instrumentation.note_cache(fig is not None)
+        if fig is None:
+            fig = build(*args, **kwargs)
+            cache.put(key, fig)
+        return fig
+
+    return wrapper
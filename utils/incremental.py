@@ -0,0 +1,95 @@
+"""
+Helpers for structures that are maintained incrementally as bills arrive.
+
+Bills are normally only appended to the sheets, so a structure built from
+the first N rows can be brought up to date by folding in rows N onwards.
+Older rows do get corrected now and then (an amount or a phone number,
+picked up by the connector's full reloads), so each structure keeps a
+fingerprint of all N rows it ingested and compares it with the first N
+rows of the new frame; on any mismatch it is rebuilt from scratch. Hashing
+the rows is one vectorised pass, far cheaper than the aggregation it saves.
+
+Summed tables (the daily rollup, customer months) subclass FoldedTable and
+only say how to aggregate a batch of bills.
+"""
+import hashlib
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+import pandas as pd
+
+
+def _row_hashes(df: pd.DataFrame):
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def fingerprint(df: pd.DataFrame, rows: int = None) -> str:
+    """Hash of the first `rows` rows of `df` (all of them by default)."""
+    hashes = _row_hashes(df.iloc[:rows] if rows is not None else df)
+    return hashlib.blake2b(hashes.tobytes(), digest_size=16).hexdigest()
+
+
+def appended_rows(df: pd.DataFrame, rows: int, expected: str) -> tuple:
+    """
+    (first row to fold in, fingerprint of all of `df`), from one pass over `df`.
+
+    The first row is `rows` when `df` starts with the rows that produced
+    fingerprint `expected`, and 0 (rebuild) otherwise.
+    """
+    hashes = _row_hashes(df)
+    digest = hashlib.blake2b(digest_size=16)
+    start = 0
+    if expected is not None and len(df) >= rows:
+        digest.update(hashes[:rows].tobytes())
+        if digest.copy().hexdigest() == expected:
+            start = rows
+        hashes = hashes[rows:]
+    digest.update(hashes.tobytes())
+    return start, digest.hexdigest()
+
+
+def regroup(frame: pd.DataFrame, keys: list) -> pd.DataFrame:
+    """Sum `frame` to one row per `keys`; integer (count) columns stay int32."""
+    table = frame.groupby(keys, dropna=False, sort=False).sum(min_count=0).reset_index()
+    counts = [col for col in table.columns if col not in keys and pd.api.types.is_integer_dtype(table[col])]
+    table[counts] = table[counts].astype("int32")
+    return table
+
+
+@dataclass(frozen=True)
+class FoldedTable(ABC):
+    """
+    A table summed from the bills, plus what is needed to fold in new ones.
+
+    Subclasses set KEYS (the group-by columns), EMPTY_BILLS (a frame with
+    the bill columns they read) and implement aggregate().
+    """
+    table: pd.DataFrame
+    rows: int = 0
+    fingerprint: str = None
+
+    KEYS = []
+    EMPTY_BILLS = pd.DataFrame()
+
+    @staticmethod
+    @abstractmethod
+    def aggregate(bills: pd.DataFrame) -> pd.DataFrame:
+        """One row per KEYS for a batch of bills (built with regroup())."""
+
+    @classmethod
+    def empty(cls):
+        return cls(cls.aggregate(cls.EMPTY_BILLS))
+
+    def updated(self, bills: pd.DataFrame):
+        """Table for `bills`, aggregating only the rows appended since this one."""
+        if bills.empty:
+            return self.empty()
+
+        start, fingerprint = appended_rows(bills, self.rows, self.fingerprint)
+        if start == len(bills):
+            return self
+        table = self.aggregate(bills.iloc[start:])
+        if start:
+            table = regroup(pd.concat([self.table, table], ignore_index=True), self.KEYS)
+
+        return type(self)(table, len(bills), fingerprint)
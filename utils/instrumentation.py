@@ -0,0 +1,200 @@
+"""
+Lightweight tracing of where a rerun spends its time.
+
+Sheet fetches, preprocessing, snapshot builds, query functions and plot
+functions are decorated with @traced(kind). Each call records its wall
+time, rows in and out, and whether it was served from a cache; calls made
+while another traced call is running are nested under it. The calls of one
+Streamlit rerun (or one fragment rerun, or one background sync) are kept
+together as a Rerun, and the last RERUN_HISTORY reruns are held in a ring
+buffer for the admin diagnostics tab.
+
+Recording a call is a couple of perf_counter() reads and a list append, so
+tracing stays on in production. Set BLSH_INSTRUMENTATION=0 to turn it off.
+"""
+import functools
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+ENABLED = os.environ.get("BLSH_INSTRUMENTATION", "1") != "0"
+
+# 🧾 Number of reruns kept for the diagnostics tab
+RERUN_HISTORY = int(os.environ.get("BLSH_DIAG_RERUNS", "50"))
+
+
+@dataclass
+class Call:
+    name: str
+    kind: str
+    depth: int
+    start: float  # seconds since the rerun started
+    seconds: float = 0.0
+    rows_in: int = None
+    rows_out: int = None
+    cache: str = None  # "hit", "miss" or None
+
+
+@dataclass
+class Rerun:
+    label: str
+    started_at: float  # time.time() when the rerun started
+    seconds: float = 0.0
+    calls: list = field(default_factory=list)
+
+
+_reruns = deque(maxlen=RERUN_HISTORY)
+_reruns_lock = threading.Lock()
+_local = threading.local()  # .rerun, .origin, .stack (open calls) for this thread
+
+
+def _open_rerun(label: str):
+    _local.rerun = Rerun(label, time.time())
+    _local.origin = time.perf_counter()
+    _local.stack = []
+
+
+def _close_rerun():
+    rerun = _local.rerun
+    rerun.seconds = time.perf_counter() - _local.origin
+    _local.rerun = None
+    with _reruns_lock:
+        _reruns.append(rerun)
+
+
+class rerun:
+    """Group every traced call made inside the `with` block into one Rerun."""
+
+    def __init__(self, label: str = "rerun"):
+        self.label = label
+        self._owner = False
+
+    def __enter__(self):
+        if ENABLED and getattr(_local, "rerun", None) is None:
+            _open_rerun(self.label)
+            self._owner = True
+        return self
+
+    def __exit__(self, *exc):
+        if self._owner:
+            _close_rerun()
+        return False
+
+
+def _rows(value):
+    """Row count of a frame/series result, None for scalars and records."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    return None
+
+
+def traced(kind: str):
+    """Record wall time, rows and cache use of every call to the function."""
+    def decorate(func):
+        name = func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+
+            # A call outside any rerun (fragment, background thread) is its own rerun
+            with rerun(f"{kind}: {name}"):
+                stack = _local.stack
+                call = Call(name, kind, len(stack), time.perf_counter() - _local.origin)
+                if args:
+                    call.rows_in = _rows(args[0])
+                _local.rerun.calls.append(call)
+                stack.append(call)
+                try:
+                    result = func(*args, **kwargs)
+                finally:
+                    stack.pop()
+                    call.seconds = time.perf_counter() - _local.origin - call.start
+                call.rows_out = _rows(result)
+                return result
+
+        return wrapper
+    return decorate
+
+
+def _current_call():
+    stack = getattr(_local, "stack", None)
+    if not stack or getattr(_local, "rerun", None) is None:
+        return None
+    return stack[-1]
+
+
+def note_cache(hit: bool):
+    """Mark the innermost running traced call as a cache hit or miss."""
+    call = _current_call()
+    if call is not None:
+        call.cache = "hit" if hit else "miss"
+
+
+def note_rows_in(rows: int):
+    """Add to the number of input rows of the innermost running traced call."""
+    call = _current_call()
+    if call is not None:
+        call.rows_in = (call.rows_in or 0) + rows
+
+
+def reruns() -> list:
+    """The recorded reruns, oldest first."""
+    with _reruns_lock:
+        return list(_reruns)
+
+
+def calls_frame(history=None) -> pd.DataFrame:
+    """One row per recorded call, tagged with the index of its rerun."""
+    history = reruns() if history is None else history
+    rows = [
+        {"rerun": i, "label": r.label, **vars(c)}
+        for i, r in enumerate(history)
+        for c in r.calls
+    ]
+    columns = ["rerun", "label", "name", "kind", "depth", "start", "seconds", "rows_in", "rows_out", "cache"]
+    return pd.DataFrame(rows, columns=columns)
+
+
+def latency_percentiles(calls: pd.DataFrame) -> pd.DataFrame:
+    """p50/p90/p99/max latency (ms), call count and cache hit rate per function."""
+    if calls.empty:
+        return pd.DataFrame(columns=["kind", "name", "calls", "p50_ms", "p90_ms", "p99_ms", "max_ms", "cache_hit_rate"])
+
+    ms = calls.assign(ms=calls["seconds"] * 1000, hit=calls["cache"].eq("hit"), cached=calls["cache"].notna())
+    grouped = ms.groupby(["kind", "name"])
+    table = grouped["ms"].describe(percentiles=[0.5, 0.9, 0.99])
+    table = pd.DataFrame({
+        "calls": table["count"].astype(int),
+        "p50_ms": table["50%"],
+        "p90_ms": table["90%"],
+        "p99_ms": table["99%"],
+        "max_ms": table["max"],
+        "cache_hit_rate": grouped["hit"].sum() / grouped["cached"].sum().replace(0, float("nan")),
+    }).round(2)
+    return table.reset_index().sort_values("p90_ms", ascending=False, ignore_index=True)
+
+
+def slowest_calls(calls: pd.DataFrame, n: int = 20) -> pd.DataFrame:
+    """The n slowest individual calls across the recorded reruns."""
+    slowest = calls.nlargest(n, "seconds")
+    return slowest.assign(ms=(slowest["seconds"] * 1000).round(2))[
+        ["label", "kind", "name", "ms", "rows_in", "rows_out", "cache"]
+    ].reset_index(drop=True)
+
+
+def rerun_breakdown(rerun_record: Rerun) -> pd.DataFrame:
+    """Start/duration (ms) and nesting depth of each call in one rerun, for a flame chart."""
+    calls = calls_frame([rerun_record])
+    return pd.DataFrame({
+        "name": calls["name"],
+        "kind": calls["kind"],
+        "depth": calls["depth"],
+        "start_ms": (calls["start"] * 1000).round(2),
+        "ms": (calls["seconds"] * 1000).round(2),
+    })
@@ -0,0 +1,66 @@
+"""
+Per-customer visit and spend totals, and leaderboards built on them.
+
+CustomerMonths keeps one row per (month, customer) with the number of
+bills, how many of them had an amount, and their total. It is folded
+forward as bills are appended, like the daily rollup, so the per-customer
+aggregate never rescans the full bill history.
+
+A Leaderboard is the per-customer aggregate over a window of months,
+sorted once by spend. The top or bottom k customers are then a slice of
+k rows, however many customers there are.
+"""
+import numpy as np
+import pandas as pd
+
+from utils import incremental
+
+MONTH_KEYS = ["month", "customer_id"]
+
+
+def monthly_totals(bills: pd.DataFrame) -> pd.DataFrame:
+    """Aggregate bills carrying a "Customer ID" to one row per (month, customer)."""
+    billed = bills[bills["Customer ID"].notna()]
+    amount = billed["Bill Amount"]
+    frame = pd.DataFrame({
+        "month": billed["Timestamp"].to_numpy().astype("datetime64[M]").astype("datetime64[ns]"),
+        "customer_id": billed["Customer ID"].to_numpy(dtype="int32"),
+        "visits": 1,
+        "priced": amount.notna().astype("int32").to_numpy(),
+        "total_spent": amount.fillna(0).to_numpy(),
+    })
+    return incremental.regroup(frame, MONTH_KEYS)
+
+
+_EMPTY_BILLS = pd.DataFrame({
+    "Timestamp": pd.Series(dtype="datetime64[ns]"),
+    "Bill Amount": pd.Series(dtype="float64"),
+    "Customer ID": pd.Series(dtype="Int32"),
+})
+
+
+class CustomerMonths(incremental.FoldedTable):
+    """Monthly per-customer totals plus what is needed to fold in new bills."""
+
+    KEYS = MONTH_KEYS
+    EMPTY_BILLS = _EMPTY_BILLS
+    aggregate = staticmethod(monthly_totals)
+
+
+class Leaderboard:
+    """Customers ordered by total spend (then visits), highest first."""
+
+    def __init__(self, ranked: pd.DataFrame):
+        self.ranked = ranked
+        # Customers with no priced bill sort last and are left out of bottom()
+        self._priced = int(ranked["total_spent"].notna().sum())
+
+    def __len__(self):
+        return len(self.ranked)
+
+    def top(self, k: int) -> pd.DataFrame:
+        return self.ranked.iloc[:k].reset_index(drop=True)
+
+    def bottom(self, k: int) -> pd.DataFrame:
+        rows = np.arange(self._priced - 1, max(self._priced - k, 0) - 1, -1)
+        return self.ranked.iloc[rows].reset_index(drop=True)
@@ -0,0 +1,114 @@
+"""
+Local columnar mirror of the bills worksheets.
+
+Each mirrored sheet is kept as a typed Parquet file under STORE_DIR. A sync
+step loads the worksheet from the configured data source (Google Sheets,
+delta-synced by the connector, or a local extract; see data_sources.py)
+and atomically replaces the file; the dashboard reads the local file instead of parsing
+the sheet on every rerun. Parquet files are swapped with os.replace, so a
+separate process (e.g. a cron job) can sync while the app is reading.
+
+Each file records a hash of its contents in the Parquet metadata, and a
+sync that loads the same frame leaves the file (and its mtime, which the
+refresh worker treats as the mirror version) untouched.
+"""
+import hashlib
+import os
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils import incremental, instrumentation
+from utils.data_sources import get_source
+
+STORE_DIR = os.environ.get("BLSH_STORE_DIR", "data")
+
+MIRRORED_SHEETS = {
+    "Client Data": "client_data.parquet",
+    "Product Sale": "product_sale.parquet",
+}
+
+# Parquet metadata key holding content_hash() of the mirrored frame
+CONTENT_KEY = b"blsh.content"
+
+_read_cache = {}  # path -> (mtime_ns, DataFrame)
+
+
+def store_path(sheet_name: str) -> str:
+    return os.path.join(STORE_DIR, MIRRORED_SHEETS[sheet_name])
+
+
+@instrumentation.traced("fetch")
+def sync_worksheets(sheet_names) -> dict:
+    """Load several worksheets (concurrently from Google Sheets) and replace their mirror files."""
+    frames = get_source().load_many(sheet_names)
+    return {name: _write_mirror(name, df) for name, df in frames.items()}
+
+
+def content_hash(df: pd.DataFrame) -> str:
+    """Hash of a frame's column names, dtypes and values."""
+    columns = repr(list(zip(df.columns, map(str, df.dtypes))))
+    return hashlib.blake2b((columns + incremental.fingerprint(df)).encode(), digest_size=16).hexdigest()
+
+
+def stored_hash(sheet_name: str):
+    """content_hash() of the mirror file, read from its metadata (None if missing)."""
+    try:
+        metadata = pq.read_schema(store_path(sheet_name)).metadata or {}
+    except FileNotFoundError:
+        return None
+    content = metadata.get(CONTENT_KEY)
+    return content.decode() if content is not None else None
+
+
+def _write_mirror(sheet_name: str, df: pd.DataFrame) -> bool:
+    if df.empty:
+        # Keep the last good mirror when the sheet is empty or unreachable
+        return False
+
+    content = content_hash(df)
+    if stored_hash(sheet_name) == content:
+        # Unchanged: rewriting would only bump the mtime and republish the same data
+        return False
+
+    path = store_path(sheet_name)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), CONTENT_KEY: content.encode()})
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+    return True
+
+
+def _read_mirror(path: str) -> pd.DataFrame:
+    """Read a mirror file, reusing the parsed frame until the file changes."""
+    mtime_ns = os.stat(path).st_mtime_ns
+    cached = _read_cache.get(path)
+    hit = cached is not None and cached[0] == mtime_ns
+    instrumentation.note_cache(hit)
+    if hit:
+        return cached[1]
+
+    df = pd.read_parquet(path)
+    _read_cache[path] = (mtime_ns, df)
+    return df
+
+
+def mirror_version(sheet_name: str):
+    """Identifies the mirror file's current contents (None if not synced yet)."""
+    try:
+        return os.stat(store_path(sheet_name)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def read_worksheet(sheet_name: str) -> pd.DataFrame:
+    """The mirrored worksheet as currently stored, without syncing (empty if never synced)."""
+    path = store_path(sheet_name)
+    if not os.path.exists(path):
+        return pd.DataFrame()
+
+    return _read_mirror(path).copy()
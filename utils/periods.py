@@ -0,0 +1,83 @@
+"""
+Calendar periods as half-open [start, end) timestamp ranges.
+
+Queries filter with `Timestamp >= start AND Timestamp < end` instead of
+formatting every row with strftime, so the filter is a plain range
+comparison on the (timestamp-sorted) bills table. Weeks start on Monday,
+matching the old strftime('%W') grouping.
+"""
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+
+class Period(NamedTuple):
+    start: datetime
+    end: datetime
+
+
+def _now(now=None) -> datetime:
+    return now if now is not None else datetime.now()
+
+
+def _midnight(now=None) -> datetime:
+    return _now(now).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _add_months(moment: datetime, months: int) -> datetime:
+    """Shift by whole months, clamping the day (31 Mar - 1 month -> 28/29 Feb)."""
+    month_index = moment.year * 12 + moment.month - 1 + months
+    year, month = divmod(month_index, 12)
+    first_of_next = datetime(year + (month + 1) // 12, (month + 1) % 12 + 1, 1)
+    last_day = (first_of_next - timedelta(days=1)).day
+    return moment.replace(year=year, month=month + 1, day=min(moment.day, last_day))
+
+
+def day(offset=0, now=None) -> Period:
+    """Calendar day; offset=-1 is yesterday."""
+    start = _midnight(now) + timedelta(days=offset)
+    return Period(start, start + timedelta(days=1))
+
+
+def week(offset=0, now=None) -> Period:
+    """Monday-to-Sunday week; offset=-1 is the previous week (across years too)."""
+    today = _midnight(now)
+    start = today - timedelta(days=today.weekday()) + timedelta(weeks=offset)
+    return Period(start, start + timedelta(weeks=1))
+
+
+def month(offset=0, now=None) -> Period:
+    """Calendar month; offset=-1 is the previous month (January -> December)."""
+    start = _add_months(_midnight(now).replace(day=1), offset)
+    return Period(start, _add_months(start, 1))
+
+
+def year(offset=0, now=None) -> Period:
+    """Calendar year."""
+    start = _midnight(now).replace(month=1, day=1)
+    start = start.replace(year=start.year + offset)
+    return Period(start, start.replace(year=start.year + 1))
+
+
+def year_to_date(now=None) -> Period:
+    """From 1 January up to the end of today."""
+    return Period(year(now=now).start, day(now=now).end)
+
+
+def last_days(n, now=None) -> Period:
+    """The last n calendar days plus today."""
+    end = day(now=now).end
+    return Period(end - timedelta(days=n + 1), end)
+
+
+def trailing_months(n, now=None) -> Period:
+    """From this moment n months ago up to the end of today."""
+    return Period(_add_months(_now(now), -n), day(now=now).end)
+
+
+def as_params(**periods: Period) -> dict:
+    """Named query parameters: week=Period(...) -> {"week_start": ..., "week_end": ...}."""
+    params = {}
+    for name, period in periods.items():
+        params[f"{name}_start"] = period.start
+        params[f"{name}_end"] = period.end
+    return params
@@ -0,0 +1,246 @@
+"""
+Precomputed dashboard snapshots on disk.
+
+`python main.py` (e.g. from cron) builds a Snapshot, runs every query the
+dashboard shows and writes the results to a numbered directory:
+
+    snapshots/000042/
+        manifest.json         version, as-of time, day, and one entry per result
+        client_data.parquet   the typed worksheets the results were computed from
+        product_sale.parquet
+        results/0007.parquet  frames (KPIs and other scalars are inline in the manifest)
+
+Directories are written under a temporary name and renamed into place, so
+a reader only ever sees complete snapshots. The refresh worker loads the
+newest one (utils/refresh_worker.py) and seeds the snapshot's per-snapshot
+query memo with its results, so page views read the precomputed results
+instead of running the queries.
+
+The manifest records the content hashes of the mirror files it was
+computed from. A run over the same mirror contents on the same day reuses
+the newest snapshot (see current_version) instead of writing an identical
+one, which would make the app drop its caches for nothing.
+"""
+import dataclasses
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+
+import pandas as pd
+
+import query
+from utils import instrumentation, periods
+from utils.snapshot import CLIENT_SHEET, PRODUCT_SHEET, build_snapshot
+
+SNAPSHOT_DIR = os.environ.get("BLSH_SNAPSHOT_DIR", "snapshots")
+
+# 🗂 Precomputed snapshots kept on disk (older ones are deleted)
+KEEP_SNAPSHOTS = int(os.environ.get("BLSH_SNAPSHOT_KEEP", "5"))
+
+SHEET_FILES = {
+    CLIENT_SHEET: "client_data.parquet",
+    PRODUCT_SHEET: "product_sale.parquet",
+}
+
+# Query results shown by app.py that take no arguments beyond the snapshot.
+# Like app.py, the precompute skips a sheet's queries when that sheet is empty.
+CLIENT_QUERIES = [
+    "service_kpis", "new_and_repeated_clients",
+    "cumulative_sales", "peak_hours", "weekday_visit_counts",
+    "top_clients_spend_visits", "least_clients_spend_visits", "spend_vs_visits",
+    "employee_service_ranking", "employee_revenue_ranking",
+]
+PRODUCT_QUERIES = [
+    "product_kpis",
+    "get_employee_sales", "get_employee_revenue", "get_top_products",
+    "get_sales_by_day", "get_revenue_summary", "get_incentive_by_employee",
+]
+
+
+def dashboard_calls(snap) -> list:
+    """(query name, args) of every query result the dashboard shows for this snapshot."""
+    calls = []
+    if not snap.clients.empty:
+        calls += [(name, ()) for name in CLIENT_QUERIES]
+        calls.append(("new_clients_by_period", ("month",)))
+        calls += [("service_count", (month,)) for month in query.month_options(snap)]
+    if not snap.products.empty:
+        calls += [(name, ()) for name in PRODUCT_QUERIES]
+    return calls
+
+
+def dashboard_tables(snap) -> list:
+    """The TableQuery of every paged table in the dashboard."""
+    if snap.clients.empty:
+        return []
+    tables = [query.INCENTIVES, query.DAYS_SINCE_LAST_VISIT]
+    for month in query.month_options(snap):
+        tables += [query.performance_source(snap, month), query.unique_service_source(snap, month)]
+    return tables
+
+
+def _plain(value):
+    """JSON-ready copy of a scalar or tuple result (NumPy scalars become Python numbers)."""
+    if isinstance(value, (tuple, list)):
+        return [_plain(v) for v in value]
+    return value.item() if hasattr(value, "item") else value
+
+
+def _encode(value, path: str, file_name: str) -> dict:
+    if isinstance(value, pd.DataFrame):
+        value.to_parquet(os.path.join(path, file_name))
+        return {"kind": "frame", "file": file_name}
+    if isinstance(value, pd.Series):
+        # Row results, e.g. get_revenue_summary()
+        pd.DataFrame([value]).to_parquet(os.path.join(path, file_name))
+        return {"kind": "row", "file": file_name}
+    if dataclasses.is_dataclass(value):
+        return {"kind": "dataclass", "type": type(value).__name__,
+                "value": {k: _plain(v) for k, v in dataclasses.asdict(value).items()}}
+    if isinstance(value, tuple):
+        return {"kind": "tuple", "value": _plain(value)}
+    return {"kind": "value", "value": _plain(value)}
+
+
+def _decode(entry: dict, path: str):
+    kind = entry["kind"]
+    if kind == "frame":
+        return pd.read_parquet(os.path.join(path, entry["file"]))
+    if kind == "row":
+        return pd.read_parquet(os.path.join(path, entry["file"])).iloc[0]
+    if kind == "dataclass":
+        return getattr(query, entry["type"])(**entry["value"])
+    if kind == "tuple":
+        return tuple(entry["value"])
+    return entry["value"]
+
+
+def versions(directory: str = SNAPSHOT_DIR) -> list:
+    """Version numbers of the complete snapshots in `directory`, oldest first."""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return sorted(int(name) for name in names if name.isdigit())
+
+
+def latest_version(directory: str = SNAPSHOT_DIR):
+    """The newest snapshot version, or None if nothing was precomputed."""
+    found = versions(directory)
+    return found[-1] if found else None
+
+
+def _version_path(directory: str, version: int) -> str:
+    return os.path.join(directory, f"{version:06d}")
+
+
+def _manifest_path(directory: str, version: int) -> str:
+    return os.path.join(_version_path(directory, version), "manifest.json")
+
+
+def snapshot_age(version: int, directory: str = SNAPSHOT_DIR) -> float:
+    """Seconds since `version` was written or last confirmed current by current_version()."""
+    return time.time() - os.path.getmtime(_manifest_path(directory, version))
+
+
+def current_version(sources: dict, directory: str = SNAPSHOT_DIR):
+    """
+    The newest version if it was computed today from mirror files with the
+    content hashes `sources` (else None). Its age is reset, since it was
+    just confirmed current.
+    """
+    version = latest_version(directory)
+    if version is None or None in sources.values():
+        return None
+    try:
+        with open(_manifest_path(directory, version)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if manifest.get("sources") != sources or manifest["day"] != periods.day().start.isoformat():
+        return None
+    os.utime(_manifest_path(directory, version))
+    return version
+
+
+@instrumentation.traced("precompute")
+def write_snapshot(snap, clients: pd.DataFrame, products: pd.DataFrame,
+                   directory: str = SNAPSHOT_DIR, keep: int = KEEP_SNAPSHOTS, sources: dict = None) -> str:
+    """
+    Run every dashboard query on `snap` and write a new snapshot version; returns its path.
+
+    `sources` ({sheet: mirror content hash}) is recorded for current_version().
+    """
+    version = (latest_version(directory) or 0) + 1
+    final_path = _version_path(directory, version)
+    tmp_path = os.path.join(directory, f".{version:06d}.{os.getpid()}.tmp")
+    os.makedirs(os.path.join(tmp_path, "results"))
+
+    try:
+        for name, df in ((CLIENT_SHEET, clients), (PRODUCT_SHEET, products)):
+            df.to_parquet(os.path.join(tmp_path, SHEET_FILES[name]), index=False)
+
+        day = periods.day().start
+        results = []
+        for i, (name, args) in enumerate(dashboard_calls(snap)):
+            value = getattr(query, name)(snap, *args)
+            entry = _encode(value, tmp_path, os.path.join("results", f"{i:04d}.parquet"))
+            results.append({"query": name, "args": list(args), **entry})
+
+        tables = []
+        for i, table in enumerate(dashboard_tables(snap)):
+            file_name = os.path.join("results", f"table_{i:04d}.parquet")
+            query.table_rows(snap, table).to_parquet(os.path.join(tmp_path, file_name), index=False)
+            tables.append({"sql": table.sql, "order_by": table.order_by, "params": table.params, "file": file_name})
+
+        manifest = {
+            "version": version,
+            "created": datetime.now().isoformat(),
+            "as_of": (snap.as_of or datetime.now()).isoformat(),
+            "day": day.isoformat(),
+            "sheets": SHEET_FILES,
+            "sources": sources,
+            "results": results,
+            "tables": tables,
+        }
+        with open(os.path.join(tmp_path, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=1)
+
+        try:
+            os.rename(tmp_path, final_path)
+        except OSError:
+            if os.path.exists(final_path):
+                raise FileExistsError(f"{final_path} was written by another run")
+            raise
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+    for old in versions(directory)[:-keep] if keep > 0 else []:
+        shutil.rmtree(_version_path(directory, old), ignore_errors=True)
+    return final_path
+
+
+@instrumentation.traced("precompute")
+def load_snapshot(version: int, directory: str = SNAPSHOT_DIR, previous=None):
+    """Build the Snapshot of a precomputed version, with its query results already cached."""
+    path = _version_path(directory, version)
+    with open(os.path.join(path, "manifest.json")) as f:
+        manifest = json.load(f)
+
+    clients, products = (pd.read_parquet(os.path.join(path, manifest["sheets"][name]))
+                         for name in (CLIENT_SHEET, PRODUCT_SHEET))
+    snap = build_snapshot(clients, products, previous=previous,
+                          as_of=datetime.fromisoformat(manifest["as_of"]))
+
+    # Results are valid for the day they were computed on; after midnight queries run live
+    day = datetime.fromisoformat(manifest["day"])
+    for entry in manifest["results"]:
+        snap.seed(query.result_key(entry["query"], entry["args"], day=day), _decode(entry, path))
+    for entry in manifest["tables"]:
+        table = query.TableQuery(entry["sql"], entry["order_by"], entry["params"])
+        query.seed_table(snap, table, pd.read_parquet(os.path.join(path, entry["file"])), day)
+    return snap
@@ -0,0 +1,171 @@
+"""
+Background refresh of the dashboard snapshot.
+
+One daemon thread per process syncs the mirrored worksheets from Google
+Sheets on a schedule, builds a new Snapshot when a mirror file changed and
+publishes it by swapping a single reference. Script reruns only ever read
+the published snapshot, so Google API latency or an outage never blocks a
+page render; they just keep seeing the last good snapshot and its "as of"
+time.
+
+On startup the worker first publishes whatever is already in the mirror
+store, so the first page render waits for a local Parquet read rather than
+the network. With BLSH_REFRESH_SYNC=0 the worker does not contact Google at
+all and only republishes when the mirror files are updated by another
+process (e.g. a cron job running the sync).
+
+When `python main.py` has written precomputed snapshots (utils/precompute.py),
+the newest one is published instead, with its query results already
+cached, and the worker leaves syncing to the cron job. If the newest one
+gets older than BLSH_SNAPSHOT_MAX_AGE (the cron job stopped), the worker
+warns and goes back to syncing and building snapshots itself until a new
+one is written.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from utils.snapshot import CLIENT_SHEET, PRODUCT_SHEET, build_snapshot
+
+# 🔁 Seconds between syncs of the mirrored worksheets
+REFRESH_INTERVAL_SECONDS = float(os.environ.get("BLSH_REFRESH_INTERVAL", "60"))
+
+# Fetch from Google Sheets in this process (0: only watch the mirror store)
+SYNC_ENABLED = os.environ.get("BLSH_REFRESH_SYNC", "1") != "0"
+
+# 🕰 Precomputed snapshots older than this are not served (seconds)
+PRECOMPUTED_MAX_AGE = float(os.environ.get("BLSH_SNAPSHOT_MAX_AGE", "900"))
+
+# ⏳ How long a rerun waits for the very first snapshot on a cold start
+FIRST_SNAPSHOT_TIMEOUT = float(os.environ.get("BLSH_FIRST_SNAPSHOT_TIMEOUT", "120"))
+
+SHEETS = (CLIENT_SHEET, PRODUCT_SHEET)
+
+
+class RefreshWorker:
+    """Keeps `latest` pointing at the newest immutable Snapshot."""
+
+    def __init__(self, interval: float = REFRESH_INTERVAL_SECONDS, sync: bool = SYNC_ENABLED):
+        self.interval = interval
+        self.sync = sync
+        self.latest = None
+        self._key = None
+        self._stale = None  # precomputed version last warned about
+        self._ready = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="blsh-refresh", daemon=True)
+                self._thread.start()
+
+    def wait_for_snapshot(self, timeout: float = FIRST_SNAPSHOT_TIMEOUT):
+        """The latest snapshot, waiting for the first one on a cold start (None on timeout)."""
+        self.start()
+        self._ready.wait(timeout)
+        return self.latest
+
+    def _run(self):
+        self._publish()
+        while True:
+            if self.sync and not self._precomputed():
+                self._sync_sheets()
+            self._publish()
+            self._ready.set()
+
+            time.sleep(self.interval)
+
+    def _sync_sheets(self):
+        from utils import mirror_store
+
+        try:
+            # Both worksheets download concurrently
+            mirror_store.sync_worksheets(SHEETS)
+        except Exception as e:
+            # Keep serving the last published snapshot
+            print(f"❌ Background sync failed: {e}")
+
+    def _precomputed(self):
+        """The newest precomputed snapshot version, or None if there is none or it is too old to serve."""
+        from utils import precompute
+
+        version = precompute.latest_version()
+        if version is None:
+            return None
+        try:
+            age = precompute.snapshot_age(version)
+        except OSError:
+            return None  # pruned by a newer run in the meantime
+        if age <= PRECOMPUTED_MAX_AGE:
+            return version
+
+        if self._stale != version:
+            self._stale = version
+            print(f"⚠️ Precomputed snapshot {version} is {age:,.0f}s old (is the main.py cron job "
+                  f"running?); syncing in the app until a newer one is written")
+        return None
+
+    def _publish(self):
+        version = self._precomputed()
+        if version is not None:
+            self._publish_precomputed(version)
+        else:
+            self._publish_from_store()
+
+    def _publish_precomputed(self, version: int):
+        """Load and publish precomputed snapshot `version` unless it is already published."""
+        from utils import precompute
+
+        key = ("precomputed", version)
+        if key == self._key:
+            return
+        try:
+            snapshot = precompute.load_snapshot(version, previous=self.latest)
+        except Exception as e:
+            print(f"❌ Loading precomputed snapshot {version} failed: {e}")
+            return
+
+        self.latest = snapshot
+        self._key = key
+        self._ready.set()
+
+    def _publish_from_store(self):
+        """Build and publish a snapshot if the mirror files changed since the last one."""
+        from utils import mirror_store
+
+        try:
+            key = tuple(mirror_store.mirror_version(sheet) for sheet in SHEETS)
+            if self.latest is not None and key == self._key:
+                return
+            if all(version is None for version in key) and self.latest is None and self.sync:
+                # Cold store: wait for the first sync instead of publishing nothing
+                return
+
+            frames = [mirror_store.read_worksheet(sheet) for sheet in SHEETS]
+            versions = [version for version in key if version is not None]
+            as_of = datetime.fromtimestamp(max(versions) / 1e9) if versions else None
+            snapshot = build_snapshot(*frames, previous=self.latest, as_of=as_of)
+        except Exception as e:
+            print(f"❌ Building snapshot failed: {e}")
+            return
+
+        # A single reference swap: readers see either the old or the new snapshot
+        self.latest = snapshot
+        self._key = key
+        self._ready.set()
+
+
+worker = RefreshWorker()
+
+
+def latest_snapshot():
+    """The most recently published snapshot (an empty one if none could be built yet)."""
+    snapshot = worker.wait_for_snapshot()
+    if snapshot is None:
+        return build_snapshot(pd.DataFrame(), pd.DataFrame())
+    return snapshot
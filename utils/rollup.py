@@ -0,0 +1,47 @@
+"""
+Daily rollup of the service bills.
+
+One row per (day, employee, hour) with the number of bills, their total
+amount and how many bills included each service. Employee rankings,
+incentives, peak hours, weekday visits and period sales read this table
+instead of scanning every bill, so they touch roughly
+days x employees x opening hours rows however long the history gets.
+"""
+import pandas as pd
+
+import query
+from utils import incremental
+
+ROLLUP_KEYS = ["day", "employee", "hour"]
+
+
+def rollup_bills(bills: pd.DataFrame) -> pd.DataFrame:
+    """Aggregate compact preprocessed bills to one row per (day, employee, hour)."""
+    frame = pd.DataFrame({
+        "day": bills["Timestamp"].dt.normalize(),
+        "employee": bills["Service done by"].astype("string"),
+        "hour": bills["Timestamp"].dt.hour.astype("Int8"),
+        "bills": 1,
+        "amount": bills["Bill Amount"],
+    })
+    for col in query.SERVICE_COLUMNS:
+        if col in bills.columns:
+            frame[col] = bills[col].astype("int32")
+
+    return incremental.regroup(frame, ROLLUP_KEYS)
+
+
+_EMPTY_BILLS = pd.DataFrame({
+    "Timestamp": pd.Series(dtype="datetime64[us]"),
+    "Service done by": pd.Series(dtype="string"),
+    "Bill Amount": pd.Series(dtype="float64"),
+    **{col: pd.Series(dtype=bool) for col in query.SERVICE_COLUMNS},
+})
+
+
+class DailyRollup(incremental.FoldedTable):
+    """Rollup table plus what is needed to fold in newly appended bills."""
+
+    KEYS = ROLLUP_KEYS
+    EMPTY_BILLS = _EMPTY_BILLS
+    aggregate = staticmethod(rollup_bills)
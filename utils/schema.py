@@ -0,0 +1,172 @@
+"""
+Declared column types of the bills worksheets, and typed ingest.
+
+Raw 2-D sheet values (header + rows of strings, as returned by the values
+API) are turned straight into typed columns, one vectorised parse per
+column, instead of building a dict per row and guessing each cell's type.
+The same parsers type frames from the local data sources.
+
+Values that do not parse are not silently coerced away: each sheet's
+latest problems are kept as ParseErrors (see parse_errors()) and printed.
+"""
+import re
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+import query
+
+TIMESTAMP_FORMAT = "%d/%m/%Y %H:%M:%S"
+SALE_DATE_FORMAT = "%d-%b-%Y"
+
+# Column kinds: "datetime" (with a format), "float", "flag" (non-empty cell = done), "text"
+SCHEMAS = {
+    "Client Data": {
+        "Timestamp": ("datetime", TIMESTAMP_FORMAT),
+        "Bill Amount": ("float", None),
+        **{col: ("flag", None) for col in query.SERVICE_COLUMNS},
+    },
+    "Product Sale": {
+        "Timestamp": ("datetime", TIMESTAMP_FORMAT),
+        "Date": ("datetime", SALE_DATE_FORMAT),
+        "Bill Amount": ("float", None),
+    },
+}
+
+# Undeclared sheets/columns are text, except these which are typed everywhere
+DEFAULT_COLUMNS = {
+    "Timestamp": ("datetime", TIMESTAMP_FORMAT),
+    "Bill Amount": ("float", None),
+}
+
+_AMOUNT_NOISE = re.compile(r"[,₹\s]|^Rs\.?", re.IGNORECASE)
+
+MAX_EXAMPLES = 5
+
+
+@dataclass(frozen=True)
+class ParseError:
+    """Values of one column that did not match its declared type."""
+    sheet: str
+    column: str
+    count: int
+    rows: tuple  # sheet row numbers of the first few bad values
+    examples: tuple
+
+
+_errors = {}  # sheet -> [ParseError]
+
+
+def _column_types(sheet_name: str) -> dict:
+    return SCHEMAS.get(sheet_name, DEFAULT_COLUMNS)
+
+
+def _blank(text: pd.Series) -> np.ndarray:
+    return (text.isna() | (text.str.strip() == "")).fillna(True).to_numpy(dtype=bool)
+
+
+def _text(series: pd.Series) -> pd.Series:
+    """Text column; whole numbers stored as floats (a numeric column with gaps) lose the ".0"."""
+    text = series.astype("string")
+    if pd.api.types.is_float_dtype(series):
+        whole = (series.notna() & (series % 1 == 0) & (series.abs() < 2**53)).to_numpy()
+        text[whole] = series[whole].astype("int64").astype("string")
+    return text
+
+
+def _parse(values, kind: str, fmt: str):
+    """Typed column plus a mask of non-empty values that failed to parse."""
+    series = values if isinstance(values, pd.Series) else pd.Series(values, dtype=object)
+
+    if kind == "datetime":
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return series, np.zeros(len(series), dtype=bool)
+        text = series.astype("string")
+        parsed = pd.to_datetime(text.str.strip(), format=fmt, errors="coerce")
+        return parsed, parsed.isna().to_numpy() & ~_blank(text)
+
+    if kind == "float":
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            return series.astype("float64"), np.zeros(len(series), dtype=bool)
+        text = series.astype("string")
+        blank = _blank(text)
+        parsed = pd.to_numeric(text, errors="coerce").astype("float64")
+        retry = parsed.isna().to_numpy() & ~blank
+        if retry.any():
+            # Formatted amounts ("1,250", "₹ 900"): strip the noise from just those
+            cleaned = text[retry].str.replace(_AMOUNT_NOISE, "", regex=True)
+            parsed[retry] = pd.to_numeric(cleaned, errors="coerce").astype("float64")
+        return parsed, parsed.isna().to_numpy() & ~blank
+
+    if kind == "flag":
+        if pd.api.types.is_bool_dtype(series):
+            return series.astype(bool), np.zeros(len(series), dtype=bool)
+        return pd.Series(~_blank(series.astype("string"))), np.zeros(len(series), dtype=bool)
+
+    # Phone numbers from SQLite/Parquet extracts come in as numbers, float64 if any is missing
+    return _text(series), np.zeros(len(series), dtype=bool)
+
+
+def _build(sheet_name: str, columns: dict, first_row: int) -> tuple:
+    types = _column_types(sheet_name)
+    typed = {}
+    errors = []
+    for name, values in columns.items():
+        kind, fmt = types.get(name, ("text", None))
+        typed[name], bad = _parse(values, kind, fmt)
+        if bad.any():
+            where = np.flatnonzero(bad)
+            raw = pd.Series(values, dtype=object) if not isinstance(values, pd.Series) else values
+            errors.append(ParseError(
+                sheet_name,
+                name,
+                int(bad.sum()),
+                tuple(int(i) + first_row for i in where[:MAX_EXAMPLES]),
+                tuple(str(v) for v in raw.iloc[where[:MAX_EXAMPLES]]),
+            ))
+    return pd.DataFrame(typed), errors
+
+
+def _record(sheet_name: str, errors: list, replace: bool):
+    if replace:
+        _errors[sheet_name] = list(errors)
+    else:
+        _errors.setdefault(sheet_name, []).extend(errors)
+
+    for e in errors:
+        print(f"⚠️ {e.count} value(s) in '{e.sheet}' column '{e.column}' could not be parsed "
+              f"(rows {', '.join(map(str, e.rows))}): {', '.join(map(repr, e.examples))}")
+
+
+def typed_frame(sheet_name: str, header: list, rows: list, first_row: int = 2) -> pd.DataFrame:
+    """
+    Typed frame from raw sheet values; rows must be padded to the header width.
+
+    `first_row` is the sheet row number of rows[0] (2 = right below the
+    header, i.e. a full load, which replaces the sheet's recorded errors;
+    anything else is an appended block whose errors are added).
+    """
+    if rows:
+        grid = np.empty((len(rows), len(header)), dtype=object)
+        grid[:] = rows
+        columns = {name: grid[:, i] for i, name in enumerate(header)}
+    else:
+        columns = {name: np.empty(0, dtype=object) for name in header}
+
+    df, errors = _build(sheet_name, columns, first_row)
+    _record(sheet_name, errors, replace=first_row == 2)
+    return df
+
+
+def typed(sheet_name: str, df: pd.DataFrame) -> pd.DataFrame:
+    """Apply the sheet's declared types to an already tabular frame (CSV, Parquet, SQLite)."""
+    typed_df, errors = _build(sheet_name, {col: df[col].reset_index(drop=True) for col in df.columns}, 2)
+    _record(sheet_name, errors, replace=True)
+    return typed_df
+
+
+def parse_errors() -> pd.DataFrame:
+    """The latest parse problems of every sheet, one row per column."""
+    rows = [vars(e) for errors in _errors.values() for e in errors]
+    return pd.DataFrame(rows, columns=["sheet", "column", "count", "rows", "examples"])
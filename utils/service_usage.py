@@ -0,0 +1,56 @@
+"""
+Service usage as a boolean bills x services matrix.
+
+Built once per snapshot from the compact service flags. Per-month or
+per-range service counts are NumPy column sums over (a slice of) the
+matrix, instead of melting the bills into a frame ten times their size.
+"""
+import numpy as np
+import pandas as pd
+
+import query
+
+
+class ServiceUsage:
+    """Which services each bill included, plus the month and time of each bill."""
+
+    def __init__(self, bills: pd.DataFrame):
+        self.services = [col for col in query.SERVICE_COLUMNS if col in bills.columns]
+        self.matrix = bills[self.services].to_numpy(dtype=bool)
+
+        if "Month" in bills.columns:
+            self.month_codes = bills["Month"].cat.codes.to_numpy()
+            self.timestamps = bills["Timestamp"].to_numpy()
+        else:
+            self.month_codes = np.empty(0, dtype=np.int8)
+            self.timestamps = np.empty(0, dtype="datetime64[us]")
+
+    def _table(self, totals) -> pd.DataFrame:
+        """Service/count frame, most used first, leaving out unused services."""
+        result = pd.DataFrame({"Service": self.services, "count": np.asarray(totals, dtype="int64")})
+        result = result[result["count"] > 0]
+        return result.sort_values("count", ascending=False, kind="stable", ignore_index=True)
+
+    def counts(self, month=None) -> pd.DataFrame:
+        """Service counts over all bills, or over one month name (any year)."""
+        if month is None:
+            return self._table(self.matrix.sum(axis=0))
+
+        rows = self.month_codes == query.MONTHS.index(month)
+        return self._table(self.matrix[rows].sum(axis=0))
+
+    def counts_by_month(self) -> dict:
+        """Service counts for every month name and "All months", in one grouped pass."""
+        per_month = pd.DataFrame(self.matrix, columns=self.services).groupby(self.month_codes).sum()
+        tables = {
+            query.MONTHS[code]: self._table(totals)
+            for code, totals in per_month.iterrows()
+            if code >= 0
+        }
+        tables["All months"] = self._table(per_month.sum())
+        return tables
+
+    def counts_between(self, start, end) -> pd.DataFrame:
+        """Service counts for bills in [start, end); bills must be sorted by Timestamp."""
+        lo, hi = np.searchsorted(self.timestamps, [np.datetime64(start), np.datetime64(end)])
+        return self._table(self.matrix[lo:hi].sum(axis=0))
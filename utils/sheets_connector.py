@@ -1,6 +1,13 @@
-import gspread
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
-from google.oauth2.service_account import Credentials
+
+from utils import instrumentation, mirror_store, schema
 
 # Path to your service account credentials
 SERVICE_ACCOUNT_FILE = "blsh_dashboard/streamlit.json"
@@ -11,26 +18,269 @@ SCOPES = [
     "https://www.googleapis.com/auth/drive"
 ]
 
-# Load credentials and authorize client
-import streamlit as st
-creds = Credentials.from_service_account_info(st.secrets["gcp_service_account"], scopes=SCOPES)
+# 📄 The bills spreadsheet; set BLSH_SPREADSHEET_KEY to skip the Drive lookup by title
+SPREADSHEET_TITLE = "BLSH_Bills and Data"
+SPREADSHEET_KEY = os.environ.get("BLSH_SPREADSHEET_KEY")
+
+# 🧵 Worksheets downloaded in parallel by fetch_sheets_data
+FETCH_WORKERS = int(os.environ.get("BLSH_FETCH_WORKERS", "4"))
+
+# 📥 Bills are only ever appended to these sheets, so they are synced in deltas
+APPEND_ONLY_SHEETS = {"Client Data", "Product Sale"}
+
+# Trailing rows re-read on every delta sync to detect edits/deletions
+DELTA_CHECK_ROWS = int(os.environ.get("BLSH_DELTA_CHECK_ROWS", "50"))
+
+# Force a full reload at least this often to pick up edits to older rows
+DELTA_FULL_RELOAD_SECONDS = float(os.environ.get("BLSH_DELTA_FULL_RELOAD", "3600"))
+
+# Authorized Google client, created on the first fetch so importing this
+# module does not load gspread/google-auth or read the secrets
+_client_handle = None
+_client_lock = threading.Lock()
+
+# One download at a time per worksheet
+_fetch_locks = {}
+_fetch_locks_lock = threading.Lock()
 
-client = gspread.authorize(creds)
+# Spreadsheet and worksheet handles, opened once and reused
+_spreadsheet_handle = None
+_worksheets = {}
+_handle_lock = threading.Lock()
+
+# Delta sync state per append-only sheet: header, rows ingested, checksum
+# of the trailing window, when the last full reload happened and the frame.
+# Also saved next to the mirror file (without the frame, which the mirror
+# holds), so a fresh process such as the cron precompute resumes the delta
+# sync instead of downloading the whole sheet.
+_sync_state = {}
+
+
+def _rows_checksum(rows) -> str:
+    """Cheap fingerprint of a block of raw sheet rows."""
+    h = hashlib.blake2b(digest_size=16)
+    for row in rows:
+        h.update("\x1f".join(row).encode("utf-8"))
+        h.update(b"\x1e")
+    return h.hexdigest()
+
+
+def _pad_rows(rows, width):
+    """The values API trims trailing blank cells; pad rows back to the header width."""
+    return [row + [""] * (width - len(row)) if len(row) < width else row[:width] for row in rows]
+
+
+def _full_sync(sheet_name: str, sheet) -> pd.DataFrame:
+    values = sheet.get_all_values()
+    if len(values) < 2:
+        _sync_state.pop(sheet_name, None)
+        print(f"⚠️ No data found in sheet: {sheet_name}")
+        return pd.DataFrame()
 
-def get_sheet_data(sheet_name: str) -> pd.DataFrame:
-    """Fetch live data from Google Sheet and return as DataFrame."""
+    header, rows = values[0], _pad_rows(values[1:], len(values[0]))
+    df = schema.typed_frame(sheet_name, header, rows)
+
+    _sync_state[sheet_name] = {
+        "header": header,
+        "rows": len(rows),
+        "checksum": _rows_checksum(rows[-DELTA_CHECK_ROWS:]),
+        "full_at": time.time(),
+        "df": df,
+    }
+    _save_state(sheet_name)
+    return df
+
+
+def _state_path(sheet_name: str) -> str:
+    return os.path.splitext(mirror_store.store_path(sheet_name))[0] + ".sync.json"
+
+
+def _save_state(sheet_name: str):
+    """Write the sheet's delta sync state, with the content hash its frame will have in the mirror."""
+    state = _sync_state[sheet_name]
+    saved = {key: state[key] for key in ("header", "rows", "checksum", "full_at")}
+    saved["content"] = mirror_store.content_hash(state["df"])
+
+    path = _state_path(sheet_name)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
     try:
-        sheet = client.open("BLSH_Bills and Data").worksheet(sheet_name)
-        data = sheet.get_all_records()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(tmp_path, "w") as f:
+            json.dump(saved, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠️ Could not save the sync state of sheet '{sheet_name}': {e}")
+
+
+def _restored_state(sheet_name: str):
+    """The saved delta sync state, if the mirror file still holds the frame it describes (else None)."""
+    try:
+        with open(_state_path(sheet_name)) as f:
+            saved = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Ignoring the saved sync state of sheet '{sheet_name}': {e}")
+        return None
+
+    if saved.get("content") is None or mirror_store.stored_hash(sheet_name) != saved["content"]:
+        # The mirror was written from other data (or not at all) since
+        return None
+
+    state = {key: saved[key] for key in ("header", "rows", "checksum", "full_at")}
+    state["df"] = mirror_store.read_worksheet(sheet_name)
+    _sync_state[sheet_name] = state
+    return state
+
+
+def _delta_sync(sheet_name: str, sheet) -> pd.DataFrame:
+    """
+    Fetch only the rows appended since the last sync.
+
+    The trailing DELTA_CHECK_ROWS already-ingested rows are fetched again in
+    the same request and compared by checksum; any mismatch (edited or
+    deleted rows, changed header) falls back to a full reload.
+    """
+    from gspread.utils import rowcol_to_a1
+
+    state = _sync_state.get(sheet_name) or _restored_state(sheet_name)
+    if (
+        state is None
+        or state["rows"] == 0
+        or time.time() - state["full_at"] >= DELTA_FULL_RELOAD_SECONDS
+    ):
+        return _full_sync(sheet_name, sheet)
 
-        # Handle empty sheet case
-        if not data:
-            print(f"⚠️ No data found in sheet: {sheet_name}")
-            return pd.DataFrame()
+    header, ingested = state["header"], state["rows"]
+    window = min(DELTA_CHECK_ROWS, ingested)
+    last_col = rowcol_to_a1(1, len(header)).rstrip("0123456789")
+    first_row = ingested - window + 2  # +1 for the header, +1 for 1-based rows
 
-        df = pd.DataFrame(data)
-        return df
+    head_range, tail_range = sheet.batch_get(["1:1", f"A{first_row}:{last_col}"])
+    current_header = head_range[0] if head_range else []
+    tail = _pad_rows(list(tail_range), len(header))
 
+    if (
+        current_header[: len(header)] != header
+        or len(current_header) > len(header)
+        or len(tail) < window
+        or _rows_checksum(tail[:window]) != state["checksum"]
+    ):
+        print(f"🔄 Rows changed in sheet '{sheet_name}', doing a full reload")
+        return _full_sync(sheet_name, sheet)
+
+    new_rows = tail[window:]
+    if not new_rows:
+        return state["df"]
+
+    new_df = schema.typed_frame(sheet_name, header, new_rows, first_row=ingested + 2)
+    df = pd.concat([state["df"], new_df], ignore_index=True)
+    state.update(
+        rows=ingested + len(new_rows),
+        checksum=_rows_checksum(tail[-DELTA_CHECK_ROWS:]),
+        df=df,
+    )
+    _save_state(sheet_name)
+    return df
+
+
+def _sheet_lock(sheet_name: str) -> threading.RLock:
+    """One lock per worksheet so a sheet is never downloaded twice at once."""
+    with _fetch_locks_lock:
+        return _fetch_locks.setdefault(sheet_name, threading.RLock())
+
+
+def _client():
+    """The authorized gspread client, created on first use."""
+    global _client_handle
+    with _client_lock:
+        if _client_handle is None:
+            import gspread
+            import streamlit as st
+            from google.oauth2.service_account import Credentials
+
+            creds = Credentials.from_service_account_info(st.secrets["gcp_service_account"], scopes=SCOPES)
+            _client_handle = gspread.authorize(creds)
+        return _client_handle
+
+
+def _spreadsheet():
+    """Open the spreadsheet once, by key when configured, and reuse the handle."""
+    global _spreadsheet_handle
+    client = _client()
+    with _handle_lock:
+        if _spreadsheet_handle is None:
+            if SPREADSHEET_KEY:
+                _spreadsheet_handle = client.open_by_key(SPREADSHEET_KEY)
+            else:
+                _spreadsheet_handle = client.open(SPREADSHEET_TITLE)
+        return _spreadsheet_handle
+
+
+def _worksheet(sheet_name: str):
+    with _handle_lock:
+        sheet = _worksheets.get(sheet_name)
+    if sheet is None:
+        sheet = _spreadsheet().worksheet(sheet_name)
+        with _handle_lock:
+            _worksheets[sheet_name] = sheet
+    return sheet
+
+
+def _forget_handles():
+    """Drop cached handles so the next fetch reopens (sheet renamed, access changed...)."""
+    global _spreadsheet_handle
+    with _handle_lock:
+        _spreadsheet_handle = None
+        _worksheets.clear()
+
+
+@instrumentation.traced("fetch")
+def _fetch_sheet(sheet_name: str) -> pd.DataFrame:
+    """Download one worksheet from Google Sheets. Raises on API errors."""
+    try:
+        return _download(sheet_name)
+    except Exception:
+        _forget_handles()
+        raise
+
+
+def _download(sheet_name: str) -> pd.DataFrame:
+    with _sheet_lock(sheet_name):
+        sheet = _worksheet(sheet_name)
+        if sheet_name in APPEND_ONLY_SHEETS:
+            return _delta_sync(sheet_name, sheet)
+
+        values = sheet.get_all_values()
+
+    # Handle empty sheet case
+    if len(values) < 2:
+        print(f"⚠️ No data found in sheet: {sheet_name}")
+        return pd.DataFrame()
+
+    return schema.typed_frame(sheet_name, values[0], _pad_rows(values[1:], len(values[0])))
+
+
+@instrumentation.traced("fetch")
+def fetch_sheet_data(sheet_name: str) -> pd.DataFrame:
+    """Fetch a worksheet from Google Sheets as a typed DataFrame (empty on errors)."""
+    try:
+        return _fetch_sheet(sheet_name)
     except Exception as e:
         print(f"❌ Error fetching data from sheet '{sheet_name}': {e}")
         return pd.DataFrame()
+
+
+def _fetch_many(fetch, sheet_names) -> dict:
+    """Run `fetch` for each worksheet on a small thread pool: total time ≈ the slowest sheet."""
+    names = list(dict.fromkeys(sheet_names))
+    if len(names) <= 1:
+        return {name: fetch(name) for name in names}
+
+    with ThreadPoolExecutor(max_workers=min(FETCH_WORKERS, len(names))) as pool:
+        return dict(zip(names, pool.map(fetch, names)))
+
+
+def fetch_sheets_data(sheet_names) -> dict:
+    """fetch_sheet_data for several worksheets at once, downloaded concurrently: {name: DataFrame}."""
+    return _fetch_many(fetch_sheet_data, sheet_names)
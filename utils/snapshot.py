@@ -0,0 +1,162 @@
+"""
+Immutable data snapshots for the dashboard queries.
+
+A Snapshot holds the preprocessed "Client Data" and "Product Sale" frames
+and one DuckDB connection on which they are registered once, as Arrow
+tables, under the names `clients` and `products`, along with derived
+tables such as the `daily_rollup`, `customers` and `customer_months`.
+Every function in query.py takes a Snapshot and runs its SQL through
+`snap.sql()`.
+"""
+import itertools
+import re
+import threading
+from datetime import datetime
+
+import duckdb
+import pandas as pd
+import pyarrow as pa
+
+import query
+from utils import instrumentation
+from utils.customers import CustomerIndex
+from utils.leaderboard import CustomerMonths
+from utils.rollup import DailyRollup
+from utils.service_usage import ServiceUsage
+
+CLIENT_SHEET = "Client Data"
+PRODUCT_SHEET = "Product Sale"
+
+_versions = itertools.count(1)
+
+
+class Snapshot:
+    """Preprocessed bills plus a DuckDB connection with them registered as tables."""
+
+    def __init__(self, clients: pd.DataFrame, products: pd.DataFrame, version: int = 0,
+                 rollup: DailyRollup = None, customers: CustomerIndex = None,
+                 customer_months: CustomerMonths = None, as_of: datetime = None):
+        self.clients = clients
+        self.products = products
+        self.version = version
+        self.as_of = as_of  # when the underlying sheet data was synced
+        self.rollup = rollup if rollup is not None else DailyRollup.empty().updated(clients)
+        self.customers = customers if customers is not None else CustomerIndex().updated(clients)
+        self.customer_months = (customer_months if customer_months is not None
+                                else CustomerMonths.empty().updated(clients))
+        self.service_usage = ServiceUsage(clients)
+
+        # A DuckDB connection must not be used from two threads at once, and
+        # Streamlit runs each browser session's script in its own thread.
+        self._lock = threading.Lock()
+        self._memo = {}
+        self._memo_lock = threading.Lock()
+        self._rows = {}  # table name -> (pattern matching it in SQL, row count)
+        self._con = duckdb.connect()
+        self.register("clients", clients)
+        self.register("products", products)
+        self.register("daily_rollup", self.rollup.table)
+        self.register("customers", self.customers.table)
+        self.register("customer_months", self.customer_months.table)
+
+    def register(self, name: str, df: pd.DataFrame):
+        """Expose a frame to SQL as `name`, converted to Arrow once."""
+        if df.columns.empty:
+            # Empty sheet: callers check `.empty` before querying it
+            return
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        with self._lock:
+            self._con.register(name, table)
+            self._rows[name] = (re.compile(rf"\b{name}\b"), len(df))
+
+    def materialize(self, name: str, query: str, params=None):
+        """Store the result of `query` as table `name`, so later queries read it instead of re-running it."""
+        self._note_rows_in(query)
+        with self._lock:
+            self._con.execute(f"CREATE OR REPLACE TEMP TABLE {name} AS {query}", params)
+            rows = self._con.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+            self._rows[name] = (re.compile(rf"\b{name}\b"), rows)
+
+    def _note_rows_in(self, query: str):
+        """Report the size of the tables a query reads to the instrumentation."""
+        if instrumentation.ENABLED:
+            instrumentation.note_rows_in(sum(rows for pattern, rows in self._rows.values() if pattern.search(query)))
+
+    def sql(self, query: str, params=None) -> pd.DataFrame:
+        self._note_rows_in(query)
+        with self._lock:
+            return self._con.execute(query, params).df()
+
+    def fetchone(self, query: str, params=None) -> tuple:
+        self._note_rows_in(query)
+        with self._lock:
+            return self._con.execute(query, params).fetchone()
+
+    def cached(self, key, compute):
+        """Compute a derived result once per snapshot; later calls reuse it."""
+        with self._memo_lock:
+            hit = key in self._memo
+            instrumentation.note_cache(hit)
+            if hit:
+                return self._memo[key]
+
+        value = compute()
+        with self._memo_lock:
+            return self._memo.setdefault(key, value)
+
+    def seed(self, key, value):
+        """Store a result computed elsewhere (e.g. a precomputed snapshot) as if cached() had computed it."""
+        with self._memo_lock:
+            self._memo.setdefault(key, value)
+
+
+def _sorted_by_time(df: pd.DataFrame) -> pd.DataFrame:
+    """Order bills by Timestamp so period filters read one contiguous range."""
+    if "Timestamp" not in df.columns:
+        return df
+    return df.sort_values("Timestamp", kind="stable", na_position="last", ignore_index=True)
+
+
+@instrumentation.traced("preprocess")
+def build_snapshot(clients: pd.DataFrame, products: pd.DataFrame, previous: Snapshot = None,
+                   as_of: datetime = None) -> Snapshot:
+    """
+    Preprocess raw sheet frames and register them on a fresh connection.
+
+    Derived tables are brought up to date from `previous` (the snapshot
+    being replaced), so only newly appended bills are aggregated. `as_of`
+    is when the frames were synced (default: now).
+    """
+    clients = query.preprocess_data(clients, compact=True)
+    products = query.preprocess_data(products, compact=True)
+
+    # Fold new bills in sheet order, before sorting by time
+    rollup = (previous.rollup if previous is not None else DailyRollup.empty()).updated(clients)
+    customers = (previous.customers if previous is not None else CustomerIndex()).updated(clients)
+    if not clients.empty:
+        clients = clients.assign(**{"Customer ID": customers.bill_ids().array})
+    customer_months = (previous.customer_months if previous is not None else CustomerMonths.empty()).updated(clients)
+
+    return Snapshot(
+        _sorted_by_time(clients),
+        _sorted_by_time(products),
+        version=next(_versions),
+        rollup=rollup,
+        customers=customers,
+        customer_months=customer_months,
+        as_of=as_of or datetime.now(),
+    )
+
+
+@instrumentation.traced("snapshot")
+def current_snapshot() -> Snapshot:
+    """
+    The latest snapshot published by the background refresh worker.
+
+    Never touches the network: the worker syncs the mirror store and
+    publishes new snapshots (see utils/refresh_worker.py). Shared by every
+    browser session in the process.
+    """
+    from utils import refresh_worker
+
+    return refresh_worker.latest_snapshot()